@@ -14,8 +14,26 @@ import pickle
 import hashlib
 from functools import lru_cache
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, NamedTuple, Tuple, Optional
 import threading
+import os
+from collections import Counter, OrderedDict
+
+import orjson
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from assets import FINGERPRINTED_NAME, asset_tags, load_manifest, service_worker_script
+from compression import CompressionMiddleware, PrecompressedStatic
+from metrics import build_product_metrics
+from reactive_timing import debounce, throttle
+from shards import ShardLayout, shard_path
+from suggest import SUGGEST_QUERY, PrefixIndex, build_index
+from table_render import table_body, table_header
 
 # Set up logging
 logging.basicConfig(
@@ -27,6 +45,8 @@ logger = logging.getLogger(__name__)
 # Cache configuration
 CACHE_TIMEOUT = 300  # 5 minutes cache timeout
 ITEMS_PER_PAGE = 25
+API_PAGE_SIZE = 200  # Rows per /api/products page for the virtualized table
+API_MAX_PAGE_SIZE = 1000
 
 # Constants for optimization
 MAX_WORKERS = 4
@@ -35,12 +55,90 @@ PRELOAD_PAGES = 3  # Number of adjacent pages to preload
 CACHE_FILE = "cache.mmap"
 CACHE_SIZE_BYTES = 1024 * 1024 * 100  # 100MB cache
 
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+WWW_DIR = Path(__file__).parent / "www"
+
+# Fingerprinted CSS/JS bundles built by assets.py; without a build the source files are served
+asset_manifest = load_manifest(WWW_DIR)
+
+# Optional category-sharded layout built by shards.py; unset means the single amazon_reviews.db
+SHARD_DIR = os.environ.get("AMAZON_REVIEWS_SHARD_DIR")
+shard_layout = ShardLayout.load(SHARD_DIR)
+
+# Server-side rate limits of the inputs that requery the product list, in seconds
+SEARCH_DEBOUNCE = float(os.environ.get("SEARCH_DEBOUNCE_SECONDS", "0.4"))
+CATEGORY_DEBOUNCE = float(os.environ.get("CATEGORY_DEBOUNCE_SECONDS", "0.6"))
+SORT_THROTTLE = float(os.environ.get("SORT_THROTTLE_SECONDS", "0.25"))
+
+# Rendered table and review fragments shared across sessions
+FRAGMENT_CACHE_ENTRIES = 512
+FRAGMENT_CACHE_BYTES = 64 * 1024 * 1024  # 64MB of HTML
+
+class QueryCounters:
+    """Process-wide counters of input events, product list refreshes and database queries"""
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+    
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+query_counters = QueryCounters()
+
+class FragmentCache:
+    """Bounded LRU of rendered HTML fragments, shared by all sessions
+
+    Keys must include the database generation so a rebuilt database never serves old
+    fragments; those simply age out.
+    """
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_ENTRIES, max_bytes: int = FRAGMENT_CACHE_BYTES):
+        self._fragments: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+    
+    def get(self, key: tuple) -> Optional[ui.HTML]:
+        with self._lock:
+            html = self._fragments.get(key)
+            if html is not None:
+                self._fragments.move_to_end(key)
+        query_counters.increment("fragment_cache_hits" if html is not None else "fragment_cache_misses")
+        return ui.HTML(html) if html is not None else None
+    
+    def set(self, key: tuple, fragment) -> ui.HTML:
+        """Render fragment to HTML once, store it and return it"""
+        html = str(fragment)
+        with self._lock:
+            previous = self._fragments.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._fragments[key] = html
+            self._bytes += len(html)
+            while len(self._fragments) > 1 and (len(self._fragments) > self._max_entries
+                                                or self._bytes > self._max_bytes):
+                _, evicted = self._fragments.popitem(last=False)
+                self._bytes -= len(evicted)
+        return ui.HTML(html)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"fragment_cache_entries": len(self._fragments), "fragment_cache_bytes": self._bytes}
+
+fragment_cache = FragmentCache()
+
 class AdvancedQueryCache:
     def __init__(self):
         self._cache: Dict[str, Any] = {}
         self._timestamps: Dict[str, float] = {}
         self._sorted_cache: Dict[str, Dict[str, pd.DataFrame]] = {}
         self._preloaded_data: Dict[str, pd.DataFrame] = {}
+        self._generation = None
         self._lock = threading.Lock()
         self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
         self._initialize_mmap_cache()
@@ -55,6 +153,26 @@ class AdvancedQueryCache:
             with open(CACHE_FILE, 'r+b') as f:
                 self._mmap = mmap.mmap(f.fileno(), CACHE_SIZE_BYTES)
     
+    def sync_generation(self, generation: tuple) -> None:
+        """Drop the in-memory results, sorted pages and filtered product pages of an older database
+
+        The mmap cache is shared with other processes, so execute_query keys its entries
+        on the generation instead and old ones expire with CACHE_TIMEOUT.
+        """
+        with self._lock:
+            if generation == self._generation:
+                return
+            changed = self._generation is not None
+            self._generation = generation
+            if changed:
+                self._cache.clear()
+                self._timestamps.clear()
+                self._sorted_cache.clear()
+                self._preloaded_data.clear()
+        if changed:
+            get_filtered_products_internal.cache_clear()
+            logger.info("Database changed; cleared the query caches")
+    
     def _get_cache_key_hash(self, key: str) -> bytes:
         return hashlib.sha256(key.encode()).digest()
     
@@ -128,12 +246,13 @@ class AdvancedQueryCache:
                         base_key,
                         page,
                         sort_column,
-                        sort_direction
+                        sort_direction,
+                        self._generation
                     )
         except Exception as e:
             print(f"Error in preload_adjacent_pages: {e}")
 
-    def _preload_page(self, base_key: str, page: int, sort_column: str, sort_direction: str):
+    def _preload_page(self, base_key: str, page: int, sort_column: str, sort_direction: str, generation: tuple):
         """Worker function for preloading a specific page"""
         try:
             # Extract search terms and categories from base_key
@@ -150,7 +269,7 @@ class AdvancedQueryCache:
             )
             
             cache_key = f"{base_key}_{page}"
-            self.set_sorted(cache_key, sort_column, sort_direction, df)
+            self.set_sorted(cache_key, sort_column, sort_direction, df, generation)
         except Exception as e:
             logger.error(f"Error preloading page {page}: {e}")
 
@@ -169,8 +288,11 @@ class AdvancedQueryCache:
             print(f"Error in get_sorted: {e}")
             return None
     
-    def set_sorted(self, base_key: str, sort_column: str, sort_direction: str, df: pd.DataFrame) -> None:
+    def set_sorted(self, base_key: str, sort_column: str, sort_direction: str, df: pd.DataFrame,
+                   generation: Optional[tuple] = None) -> None:
         with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # Read from a database that has since changed
             if base_key not in self._sorted_cache:
                 self._sorted_cache[base_key] = {}
             if sort_column not in self._sorted_cache[base_key]:
@@ -180,21 +302,52 @@ class AdvancedQueryCache:
 
 query_cache = AdvancedQueryCache()
 
-@lru_cache(maxsize=1000)
-def get_filtered_products_internal(search_term=None, categories=None, page=1, sort_column="Product Score", sort_direction="desc"):
-    """Internal function for getting filtered products with caching"""
-    sort_column_map = {
-        "Product Title": "title",
-        "Category": "category",
-        "Price": "price",
-        "Rating": "avg_rating",
-        "Reviews": "review_count",
-        "Price vs Category Avg %": "price_diff_percentage",
-        "Sentiment Score": "sentiment_per_review",
-        "Product Score": "product_score"
-    }
+SORT_COLUMN_MAP = {
+    "Product Title": "title",
+    "Category": "category",
+    "Price": "price",
+    "Rating": "avg_rating",
+    "Reviews": "review_count",
+    "Price vs Category Avg %": "price_diff_percentage",
+    "Sentiment Score": "sentiment_per_review",
+    "Product Score": "product_score"
+}
+
+class ProductView(NamedTuple):
+    """One page of the products table, in canonical form so equal views share cache entries"""
+    search_term: Optional[str]
+    categories: Optional[Tuple[str, ...]]
+    page: int
+    sort_column: str
+    sort_direction: str
+
+def product_view(search_term, categories, page, sort_column, sort_direction) -> ProductView:
+    """Blank searches are no search; categories are matched with OR, so their order does not matter"""
+    search_term = (search_term or "").strip() or None
+    categories = tuple(sorted(set(categories))) if categories else None
+    return ProductView(search_term, categories, page, sort_column, sort_direction)
+
+def products_filter(search_term=None, categories=None):
+    """WHERE clause and parameters shared by the table pages and the JSON endpoint"""
+    where = " WHERE 1=1"
+    params = []
+    
+    if search_term:
+        where += " AND (title LIKE ? OR category LIKE ?)"
+        search_pattern = f"%{search_term}%"
+        params.extend([search_pattern, search_pattern])
+        
+    if categories:
+        placeholders = " OR ".join(["category LIKE ?" for _ in categories])
+        where += f" AND ({placeholders})"
+        params.extend([f"%{cat}%" for cat in categories])
+    
+    return where, params
 
-    sql_sort_column = sort_column_map.get(sort_column, "product_score") if sort_column and sort_direction != 'none' else None
+def query_products(search_term=None, categories=None, sort_column="Product Score", sort_direction="desc",
+                   limit=ITEMS_PER_PAGE, offset=0):
+    """Rows offset..offset+limit of the filtered, sorted product list"""
+    sql_sort_column = SORT_COLUMN_MAP.get(sort_column, "product_score") if sort_column and sort_direction != 'none' else None
     sql_sort_direction = "ASC" if sort_direction == "asc" else "DESC" if sort_direction == "desc" else ""
     
     query = """
@@ -209,33 +362,46 @@ def get_filtered_products_internal(search_term=None, categories=None, page=1, so
             sentiment_per_review as "Sentiment Score",
             product_score as "Product Score"
         FROM product_metrics_mv
-        WHERE 1=1
     """
+    where, params = products_filter(search_term, categories)
+    query += where
     
-    params = []
-    
-    if search_term:
-        query += " AND (title LIKE ? OR category LIKE ?)"
-        search_pattern = f"%{search_term}%"
-        params.extend([search_pattern, search_pattern])
-        
-    if categories:
-        placeholders = " OR ".join(["category LIKE ?" for _ in categories])
-        query += f" AND ({placeholders})"
-        params.extend([f"%{cat}%" for cat in categories])
+    if shard_layout is not None:
+        # Fan out to the shards that can hold a matching category and merge their top rows
+        sort_key = sort_column if sort_column in SORT_COLUMN_MAP else "Product Score"
+        return shard_layout.query_top_n(
+            query, tuple(params), sql_sort_column, sort_key, sql_sort_direction == "DESC",
+            limit, offset, shards=shard_layout.shards_for_categories(categories)
+        )
     
     if sql_sort_column:
         query += f" ORDER BY {sql_sort_column} {sql_sort_direction}"
     
     query += " LIMIT ? OFFSET ?"
     
-    offset = (page - 1) * ITEMS_PER_PAGE
-    params.extend([ITEMS_PER_PAGE, offset])
+    params.extend([limit, offset])
     
-    return execute_query(query, tuple(params) if params else None)
+    return execute_query(query, tuple(params))
+
+def count_products(search_term=None, categories=None):
+    """Number of products matching the search and category filters"""
+    where, params = products_filter(search_term, categories)
+    query = "SELECT COUNT(*) as total FROM product_metrics_mv" + where
+    if shard_layout is not None:
+        shards = shard_layout.shards_for_categories(categories)
+        return int(shard_layout.query_all(query, tuple(params), shards)['total'].sum()) if shards else 0
+    return int(execute_query(query, tuple(params) if params else None)['total'].iloc[0])
+
+@lru_cache(maxsize=1000)
+def get_filtered_products_internal(search_term=None, categories=None, page=1, sort_column="Product Score", sort_direction="desc"):
+    """Internal function for getting filtered products with caching"""
+    offset = (page - 1) * ITEMS_PER_PAGE
+    return query_products(search_term, categories, sort_column, sort_direction, ITEMS_PER_PAGE, offset)
 
 def get_filtered_products(search_term=None, categories=None, page=1, sort_column="Product Score", sort_direction="desc"):
     """Get filtered products with advanced caching and preloading"""
+    generation = db_generation()
+    query_cache.sync_generation(generation)
     # Generate cache key
     cache_key = f"products_{search_term}_{str(categories)}_{page}"
     
@@ -247,12 +413,13 @@ def get_filtered_products(search_term=None, categories=None, page=1, sort_column
             query_cache.preload_adjacent_pages(f"products_{search_term}_{str(categories)}", page, sort_column, sort_direction)
             return cached_df
     
-    # Get data using internal function
+    # Get data using internal function (lru_cache needs hashable arguments)
+    categories = tuple(categories) if categories else None
     df = get_filtered_products_internal(search_term, categories, page, sort_column, sort_direction)
     
     # Cache the results
     if sort_column and sort_direction != 'none':
-        query_cache.set_sorted(cache_key, sort_column, sort_direction, df)
+        query_cache.set_sorted(cache_key, sort_column, sort_direction, df, generation)
         
     # Preload adjacent pages in background
     query_cache.preload_adjacent_pages(f"products_{search_term}_{str(categories)}", page, sort_column, sort_direction)
@@ -261,8 +428,7 @@ def get_filtered_products(search_term=None, categories=None, page=1, sort_column
 
 def get_db_connection():
     """Get database connection with optimized settings"""
-    db_path = Path(__file__).parent / "amazon_reviews.db"
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(DB_PATH))
     conn.execute('PRAGMA journal_mode=WAL')
     conn.execute('PRAGMA synchronous=NORMAL')
     conn.execute('PRAGMA cache_size=-2000000')
@@ -273,19 +439,29 @@ def execute_query(query: str, params: Optional[tuple] = None, cache: bool = True
     cache_key = f"{query}_{str(params)}" if params else query
     
     if cache:
+        generation = db_generation()
+        query_cache.sync_generation(generation)
+        cache_key = f"{cache_key}_{generation}"
         cached_result = query_cache.get(cache_key)
         if cached_result is not None:
+            query_counters.increment("query_cache_hits")
             logger.debug(f"Cache hit for query: {query[:100]}...")
             return cached_result
+        query_counters.increment("query_cache_misses")
     
+    conn = None
     try:
-        conn = get_db_connection()
         start_time = time.time()
         
-        if params:
-            df = pd.read_sql_query(query, conn, params=params)
+        if shard_layout is not None:
+            df = shard_layout.query_all(query, params)
         else:
-            df = pd.read_sql_query(query, conn)
+            conn = get_db_connection()
+            if params:
+                df = pd.read_sql_query(query, conn, params=params)
+            else:
+                df = pd.read_sql_query(query, conn)
+        query_counters.increment("queries_executed")
         
         query_time = time.time() - start_time
         logger.info(f"Query executed in {query_time:.2f} seconds: {query[:100]}...")
@@ -298,79 +474,183 @@ def execute_query(query: str, params: Optional[tuple] = None, cache: bool = True
         logger.error(f"Database error: {str(e)}")
         raise
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+def db_generation() -> tuple:
+    """Identity of the database's current contents
+
+    Changes when create_db.py swaps in a new build (new inode) or appends rows (the
+    main file or its WAL is written), so process-wide derived data can be rebuilt.
+    """
+    paths = [shard_path(shard_layout.shard_dir, shard) for shard in range(shard_layout.shard_count)] \
+        if shard_layout is not None else [DB_PATH]
+    stamp = []
+    for path in paths:
+        for file in (Path(path), Path(f"{path}-wal")):
+            try:
+                stat = file.stat()
+                stamp.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+    return tuple(stamp)
+
+class CategoryCache:
+    """Distinct product categories, computed once per database generation and shared by all sessions"""
+    def __init__(self):
+        self._generation = None
+        self._categories: List[str] = []
+        self._lowered: List[str] = []
+        self._lock = threading.Lock()
+    
+    def categories(self) -> List[str]:
+        generation = db_generation()
+        with self._lock:
+            if generation != self._generation:
+                df = execute_query("""
+                    SELECT DISTINCT
+                        TRIM(category) as category
+                    FROM products
+                    WHERE category IS NOT NULL
+                        AND LENGTH(category) > 1
+                """, cache=False)
+                # Shards each return their own distinct categories
+                self._categories = sorted(set(df['category'].dropna()))
+                self._lowered = [category.lower() for category in self._categories]
+                self._generation = generation
+                logger.info(f"Loaded {len(self._categories):,} categories")
+            return self._categories
+    
+    def search(self, query: str, limit: int) -> List[str]:
+        """Categories containing every word of query, in sorted order"""
+        categories = self.categories()
+        words = query.lower().split()
+        if not words:
+            return categories[:limit]
+        matches = []
+        for category, lowered in zip(categories, self._lowered):
+            if all(word in lowered for word in words):
+                matches.append(category)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+category_cache = CategoryCache()
+
+class SuggestIndexCache:
+    """Autocomplete index over titles and categories, rebuilt when the database generation changes"""
+    def __init__(self):
+        self._generation = None
+        self._index: Optional[PrefixIndex] = None
+        self._build_lock = threading.Lock()
+    
+    def index(self) -> PrefixIndex:
+        generation = db_generation()
+        # Only the first build makes requests wait; during a rebuild the previous index keeps answering
+        if generation != self._generation and self._build_lock.acquire(blocking=self._index is None):
+            try:
+                if generation != self._generation:
+                    self._index = build_index(execute_query(SUGGEST_QUERY, cache=False))
+                    self._generation = generation
+            finally:
+                self._build_lock.release()
+        return self._index
+
+suggest_cache = SuggestIndexCache()
+
+async def category_options(request: Request) -> Response:
+    """Selectize options for category_filter matching what the user has typed so far"""
+    try:
+        limit = int(request.query_params.get("maxop") or 1000)
+    except ValueError:
+        limit = 1000
+    query = request.query_params.get("query", "")
+    matches = await run_in_threadpool(category_cache.search, query, limit)
+    return JSONResponse([{"label": category, "value": category} for category in matches])
 
 def initialize_database():
     """Initialize database with optimized indexes and views"""
+    if shard_layout is not None:
+        # shards.py builds indexes and product_metrics_mv into every shard
+        return
     conn = get_db_connection()
     try:
         # Create indexes for frequently accessed columns
         conn.execute('CREATE INDEX IF NOT EXISTS idx_product_title ON products(title);')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_product_category ON products(category);')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_product_price ON products(price);')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_review_product ON reviews(product_id);')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_review_rating ON reviews(review_rating);')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_review_timestamp ON reviews(review_timestamp);')
         
-        # Create materialized view for product metrics
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS product_metrics_mv AS
-            WITH product_metrics AS (
-                SELECT 
-                    p.product_id,
-                    p.title,
-                    p.category,
-                    p.price,
-                    COUNT(r.review_id) as review_count,
-                    AVG(r.review_rating) as avg_rating,
-                    SUM(CASE 
-                        WHEN r.review_rating >= 4 THEN 2
-                        WHEN r.review_rating > 2 THEN 1
-                        ELSE -1
-                    END) as sentiment_score,
-                    SUM(CASE 
-                        WHEN julianday('now') - julianday(r.review_timestamp) <= 30 
-                        THEN 1 ELSE 0 
-                    END) as recent_reviews,
-                    AVG(p.price) OVER (PARTITION BY p.category) as avg_category_price,
-                    ROUND((p.price - AVG(p.price) OVER (PARTITION BY p.category)) * 100.0 / 
-                        NULLIF(AVG(p.price) OVER (PARTITION BY p.category), 0), 1) as price_diff_percentage,
-                    ROUND(CAST(SUM(CASE 
-                        WHEN r.review_rating >= 4 THEN 2
-                        WHEN r.review_rating > 2 THEN 1
-                        ELSE -1
-                    END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 2) as sentiment_per_review,
-                    ROUND(
-                        (COALESCE(AVG(r.review_rating), 0) * 0.3 + 
-                        COALESCE(CAST(SUM(CASE 
-                            WHEN julianday('now') - julianday(r.review_timestamp) <= 30 
-                            THEN 1 ELSE 0 
-                        END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 0) * 0.3 +
-                        CASE WHEN p.price < AVG(p.price) OVER (PARTITION BY p.category) THEN 0.2 ELSE -0.2 END +
-                        COALESCE(CAST(SUM(CASE 
-                            WHEN r.review_rating >= 4 THEN 2
-                            WHEN r.review_rating > 2 THEN 1
-                            ELSE -1
-                        END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 0) * 0.2) * 100,
-                        1
-                    ) as product_score
-                FROM products p
-                LEFT JOIN reviews r ON p.product_id = r.product_id
-                GROUP BY p.product_id, p.title, p.category, p.price
-            )
-            SELECT * FROM product_metrics;
-        """)
-        
-        # Create indexes on materialized view
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_mv_title ON product_metrics_mv(title);')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_mv_category ON product_metrics_mv(category);')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_mv_price ON product_metrics_mv(price);')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_mv_product_score ON product_metrics_mv(product_score);')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_mv_sentiment_score ON product_metrics_mv(sentiment_per_review);')
+        # Create materialized view for product metrics unless the builder already did
+        has_metrics = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_metrics_mv'"
+        ).fetchone()
+        if not has_metrics:
+            build_product_metrics(conn)
         
         conn.commit()
     finally:
         conn.close()
 
+async def products_api(request: Request) -> Response:
+    """Columnar page of products for the client-side virtualized table
+
+    Takes the table's search, categories (one parameter each), sort and direction plus an
+    opaque cursor, and returns each column as one array with the cursor of the next page
+    (null on the last one). The first page also carries the total number of matches.
+    """
+    query_params = request.query_params
+    try:
+        offset = max(0, int(query_params.get("cursor") or 0))
+        limit = min(API_MAX_PAGE_SIZE, max(1, int(query_params.get("limit") or API_PAGE_SIZE)))
+    except ValueError:
+        return JSONResponse({"error": "cursor and limit must be integers"}, status_code=400)
+    sort_direction = query_params.get("direction", "desc")
+    if sort_direction not in ("asc", "desc", "none"):
+        return JSONResponse({"error": "direction must be asc, desc or none"}, status_code=400)
+    search_term = query_params.get("search") or None
+    categories = tuple(cat.strip() for cat in query_params.getlist("categories") if cat.strip()) or None
+    sort_column = query_params.get("sort", "Product Score")
+    
+    # SQLite calls block, so keep them off the event loop the Shiny sessions share
+    df = await run_in_threadpool(query_products, search_term, categories, sort_column, sort_direction, limit, offset)
+    payload = {
+        "columns": df.columns.tolist(),
+        "values": [df[col].tolist() for col in df.columns],
+        "offset": offset,
+        "cursor": str(offset + len(df)) if len(df) == limit else None,
+    }
+    if offset == 0:
+        payload["total"] = await run_in_threadpool(count_products, search_term, categories)
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+async def suggest_api(request: Request) -> Response:
+    """Top-k completions of a title or category prefix, best product_score first"""
+    try:
+        k = int(request.query_params.get("k") or 10)
+    except ValueError:
+        return JSONResponse({"error": "k must be an integer"}, status_code=400)
+    prefix = request.query_params.get("q", "")
+    index = await run_in_threadpool(suggest_cache.index)
+    return Response(orjson.dumps({"query": prefix, "suggestions": index.suggest(prefix, k)}),
+                    media_type="application/json")
+
+async def metrics_api(request: Request) -> Response:
+    """Counters of input events, product list refreshes and queries, with cache hit rates"""
+    metrics = query_counters.snapshot()
+    metrics.update(fragment_cache.stats())
+    for cache in ("query_cache", "fragment_cache"):
+        hits, misses = metrics.get(f"{cache}_hits", 0), metrics.get(f"{cache}_misses", 0)
+        metrics[f"{cache}_hit_rate"] = round(hits / (hits + misses), 4) if hits + misses else None
+    return JSONResponse(metrics)
+
+async def service_worker(request: Request) -> Response:
+    """Service worker precaching the current bundles; revalidated so a new build replaces it"""
+    return Response(service_worker_script(asset_manifest), media_type="text/javascript",
+                    headers={"Cache-Control": "no-cache"})
+
 # UI Components
 def create_filter_input():
     """Enhanced filter input with Material Design and performance optimizations"""
@@ -379,10 +659,13 @@ def create_filter_input():
         ui.div(
             {"class": "filter-wrapper"},
             ui.tags.i({"class": "material-icons filter-icon"}, "filter_list"),
-            ui.input_text(
+            # Options are loaded from the server as the user types (see category_options)
+            ui.input_selectize(
                 "category_filter",
                 "",
-                placeholder="Filter by category...",
+                choices=[],
+                multiple=True,
+                options={"placeholder": "Filter by category..."}
             ),
             ui.input_action_button(
                 "filter_button",
@@ -394,7 +677,7 @@ def create_filter_input():
 
 app_ui = ui.page_fluid(
     ui.tags.head(
-        ui.tags.link(rel="stylesheet", href="styles.css"),
+        *asset_tags("app.css", asset_manifest),
         ui.tags.link(rel="stylesheet", href="https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap"),
         ui.tags.link(rel="stylesheet", href="https://fonts.googleapis.com/icon?family=Material+Icons"),
         ui.tags.style("""
@@ -557,6 +840,52 @@ app_ui = ui.page_fluid(
             .product-row { cursor: pointer; }
             .product-row:hover { background-color: #f8f9fa; }
             
+            /* Virtualized table: a fixed row height lets scroll offsets map to row numbers */
+            .view-toggle {
+                padding: 8px 16px;
+                background: white;
+                color: #1976D2;
+                border: 1px solid #2196F3;
+                border-radius: 4px;
+                cursor: pointer;
+                font-size: 14px;
+            }
+            .virtual-viewport {
+                height: 600px;
+                overflow-y: auto;
+                position: relative;
+                margin-top: 16px;
+            }
+            .virtual-viewport table {
+                position: absolute;
+                top: 0;
+                left: 0;
+                width: 100%;
+                border-collapse: collapse;
+                table-layout: fixed;
+            }
+            .virtual-viewport thead th {
+                position: sticky;
+                top: 0;
+                background: #f5f5f5;
+                z-index: 1;
+                padding: 12px;
+                text-align: left;
+            }
+            .virtual-viewport td {
+                height: 40px;
+                padding: 0 8px;
+                border-bottom: 1px solid #eee;
+                white-space: nowrap;
+                overflow: hidden;
+                text-overflow: ellipsis;
+            }
+            .virtual-status {
+                color: #666;
+                font-size: 14px;
+                margin-top: 8px;
+            }
+            
             /* Hide sort inputs */
             #sort_column, #sort_direction {
                 position: absolute;
@@ -650,11 +979,17 @@ app_ui = ui.page_fluid(
             ui.div(
                 {"class": "table-header"},
                 ui.h2({"class": "table-title"}, "Product List"),
-                create_filter_input()
+                create_filter_input(),
+                ui.tags.button(
+                    {"id": "virtual-toggle", "class": "view-toggle", "type": "button"},
+                    "Scroll all results"
+                )
             ),
             ui.div(
                 {"class": "table-content"},
                 ui.output_ui("products_table", class_="products-table"),
+                # Filled by www/virtual-table.js from /api/products
+                ui.div({"id": "virtual-products", "class": "virtual-table", "style": "display: none;"}),
                 ui.div(
                     {"id": "reviewsModal", "class": "modal"},
                     ui.div(
@@ -667,8 +1002,8 @@ app_ui = ui.page_fluid(
             )
         )
     ),
-    # Load script.js at the end of body
-    ui.tags.script(src="script.js"),
+    # Load the scripts at the end of body
+    *asset_tags("app.js", asset_manifest),
     # Add debug script
     ui.tags.script("""
         console.log('Page loaded');
@@ -685,129 +1020,77 @@ app_ui = ui.page_fluid(
 
 def server(input, output, session):
     # Create reactive values
-    products_data = reactive.Value(pd.DataFrame())
+    table_view = reactive.Value(None)  # ProductView the table shows
     current_page = reactive.Value(1)
     
-    # Update products when search or filters change
+    # Rate-limit the inputs on the server, so a burst of keystrokes or clicks from any client
+    # results in one query
+    @debounce(SEARCH_DEBOUNCE)
+    def search_term():
+        return input.product_search()
+    
+    @debounce(CATEGORY_DEBOUNCE)
+    def category_selection():
+        return input.category_filter()
+    
+    @throttle(SORT_THROTTLE)
+    def sort_state():
+        return input.sort_column(), input.sort_direction()
+    
     @reactive.Effect
-    @reactive.event(input.product_search, input.filter_button, input.sort_column, input.sort_direction)
+    @reactive.event(input.product_search, input.category_filter, input.sort_column, input.sort_direction)
     def _():
-        current_page.set(1)  # Reset to first page
-        # Split the filter input by commas to handle multiple categories
-        categories = [cat.strip() for cat in input.category_filter().split(',')] if input.category_filter() else None
-        products_df = get_filtered_products(
-            search_term=input.product_search(),
-            categories=categories,
-            page=current_page.get(),
-            sort_column=input.sort_column(),
-            sort_direction=input.sort_direction()
-        )
-        products_data.set(products_df)
+        query_counters.increment("input_events")
     
-    # Store unique categories
+    # Update products when search or filters change
     @reactive.Effect
+    @reactive.event(search_term, category_selection, sort_state, input.filter_button)
     def _():
-        df = execute_query("""
-            SELECT DISTINCT
-                TRIM(category) as category
-            FROM products
-            WHERE category IS NOT NULL
-                AND LENGTH(category) > 1
-            ORDER BY category;
-        """)
-        # ui.update_selectize(
-        #     "category_filter",
-        #     choices=df['category'].tolist(),
-        #     selected=[]
-        # )
+        current_page.set(1)  # Reset to first page
+        # The filter button applies the selection right away, so read it undebounced
+        categories = list(input.category_filter() or []) or None
+        sort_column, sort_direction = sort_state()
+        # The rows are only queried when products_table has no rendered copy of this view
+        table_view.set(product_view(search_term(), categories, current_page.get(), sort_column, sort_direction))
+        query_counters.increment("product_list_refreshes")
+    
+    # Server-side selectize: the browser asks for matching categories instead of receiving them all
+    session.send_input_message("category_filter", {
+        "url": session.dynamic_route("category_options", category_options)
+    })
 
     @output
     @render.ui
     def products_table():
+        view = table_view.get()
+        if view is None:
+            return None
+        cache_key = ("products_table", view, db_generation())
+        cached = fragment_cache.get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            df = products_data.get()
+            df = get_filtered_products(
+                search_term=view.search_term,
+                categories=view.categories,
+                page=view.page,
+                sort_column=view.sort_column,
+                sort_direction=view.sort_direction
+            )
             if df.empty:
-                return ui.div(
+                return fragment_cache.set(cache_key, ui.div(
                     {"class": "table-empty"},
                     ui.tags.i({"class": "fas fa-box-open", "style": "font-size: 48px; margin-bottom: 16px;"}),
                     ui.tags.h3("No Products Found"),
                     ui.tags.p("Try adjusting your search criteria or filters")
-                )
+                ))
             
-            # Create table header with sort indicators
-            columns = [
-                ("Product Title", "Product Title"),
-                ("Category", "Category"),
-                ("Price", "Price"),
-                ("Rating", "Rating"),
-                ("Reviews", "Reviews"),
-                ("Price vs Category Avg %", "Price vs Category Avg %"),
-                ("Sentiment Score", "Sentiment Score"),
-                ("Product Score", "Product Score")
-            ]
-
-            header = ui.tags.thead(
-                ui.tags.tr([
-                    ui.tags.th(
-                        {
-                            "class": f"sortable {input.sort_direction() if col[0] == input.sort_column() else ''}", 
-                            "data-column": col[0],
-                            "style": """
-                                cursor: pointer;
-                                position: relative;
-                                padding-right: 20px;
-                            """,
-                            "role": "button",
-                            "tabindex": "0"
-                        },
-                        [
-                            col[1],
-                            ui.tags.span(
-                                {
-                                    "class": f"sort-indicator {'active' if col[0] == input.sort_column() else ''}",
-                                    "style": f"""
-                                        position: absolute;
-                                        right: 5px;
-                                        top: 50%;
-                                        transform: translateY(-50%);
-                                        {'content: "↑"' if col[0] == input.sort_column() and input.sort_direction() == 'asc' else 'content: "↓"' if col[0] == input.sort_column() else ''}
-                                    """
-                                },
-                                "↑" if col[0] == input.sort_column() and input.sort_direction() == 'asc' else "↓" if col[0] == input.sort_column() else ""
-                            )
-                        ]
-                    ) for col in columns
-                ])
-            )
-
-            # Create table rows with improved interactivity
-            rows = []
-            for _, row in df.iterrows():
-                rows.append(
-                    ui.tags.tr(
-                        {
-                            "class": "product-row",
-                            "onclick": f"showReviews('{row['product_id']}')",
-                            "role": "button",
-                            "tabindex": "0"
-                        }, [
-                            ui.tags.td(row["Product Title"]),
-                            ui.tags.td(row["Category"]),
-                            ui.tags.td(row["Price"]),
-                            ui.tags.td(row["Rating"]),
-                            ui.tags.td(row["Reviews"]),
-                            ui.tags.td(row["Price vs Category Avg %"]),
-                            ui.tags.td(row["Sentiment Score"]),
-                            ui.tags.td(row["Product Score"])
-                        ]
-                    )
-                )
-
-            # Create table body
-            body = ui.tags.tbody(rows)
+            # Sort indicators for the view's sort, then the body as a single HTML block
+            header = table_header(view.sort_column, view.sort_direction)
+            body = table_body(df)
 
             # Return complete table with loading state
-            return ui.div(
+            return fragment_cache.set(cache_key, ui.div(
                 {"class": "table-container"},
                 ui.tags.div(
                     {"class": "table-loading", "id": "table-loading", "style": "display: none;"},
@@ -817,7 +1100,7 @@ def server(input, output, session):
                     {"class": "products-table"},
                     [header, body]
                 )
-            )
+            ))
         except Exception as e:
             logger.error(f"Error rendering table: {str(e)}")
             return ui.div(
@@ -833,6 +1116,10 @@ def server(input, output, session):
         product_id = input.selected_product()
         if not product_id:
             return None
+        cache_key = ("reviews_content", int(product_id), db_generation())
+        cached = fragment_cache.get(cache_key)
+        if cached is not None:
+            return cached
             
         query = """
             SELECT 
@@ -846,9 +1133,9 @@ def server(input, output, session):
             ORDER BY r.review_timestamp DESC
         """
         
-        df = execute_query(query, (product_id,))
+        df = execute_query(query, (int(product_id),))
         if df.empty:
-            return ui.p("No reviews found for this product.")
+            return fragment_cache.set(cache_key, ui.p("No reviews found for this product."))
             
         reviews = []
         product_title = df.iloc[0]['product_title']
@@ -871,9 +1158,27 @@ def server(input, output, session):
                 )
             )
             
-        return ui.div(reviews)
+        return fragment_cache.set(cache_key, ui.div(reviews))
+
+shiny_app = App(app_ui, server, static_assets=WWW_DIR)
+
+# The JSON data routes and the service worker sit next to the Shiny app; everything else
+# falls through to it. Static files are answered from their precompressed variants before
+# reaching Shiny (fingerprinted bundles as immutable for a year), and the remaining
+# HTML/JSON responses are compressed on the fly.
+app = Starlette(
+    routes=[
+        Route("/api/products", products_api, methods=["GET"]),
+        Route("/api/suggest", suggest_api, methods=["GET"]),
+        Route("/api/metrics", metrics_api, methods=["GET"]),
+        Route("/service-worker.js", service_worker, methods=["GET"]),
+        Mount("/", app=PrecompressedStatic(shiny_app, WWW_DIR, immutable=FINGERPRINTED_NAME)),
+    ],
+    middleware=[Middleware(CompressionMiddleware)],
+)
 
 if __name__ == "__main__":
+    import uvicorn
+    
     initialize_database()
-    app = App(app_ui, server, static_assets=Path(__file__).parent / "www")
-    app.run(host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import logging
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from shiny import ui
+
+logger = logging.getLogger(__name__)
+
+WWW_DIR = Path(__file__).parent / "www"
+DIST_DIR = "dist"  # Bundles are written here, relative to the asset directory
+MANIFEST_NAME = "manifest.json"
+
+HASH_LENGTH = 12
+# name.<hash>.ext, as written by build_assets; such files never change and can be cached for good
+FINGERPRINTED_NAME = re.compile(r"\.[0-9a-f]{%d}\.[a-z]+$" % HASH_LENGTH)
+
+# Bundles the page loads, and their sources in load order. The stylesheets in www/css and
+# table-styles.css are not linked by app_ui, so they stay out rather than restyle the page.
+BUNDLES = {
+    "app.css": ["styles.css"],
+    "app.js": ["service.js", "script.js", "virtual-table.js"],
+}
+
+CACHE_PREFIX = "amazon-reviews"
+
+# Strings (and unquoted url() values), comments and whitespace runs; everything else is copied as is
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\([^)"\']*\))|(/\*.*?\*/)|(\s+)', re.S)
+# Regex literals are only told apart from division by what precedes them (see _regex_allowed)
+_JS_TOKENS = re.compile(
+    r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`)|(/\*.*?\*/|//[^\n]*)|(\s+)'
+    r'|(/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*)', re.S)
+# A "/" after a value divides it; after these words it starts a regex literal
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+                   "case", "do", "else", "yield", "await"}
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+
+
+def _regex_allowed(preceding: str) -> bool:
+    """Whether a "/" after the code in preceding starts a regex literal rather than a division"""
+    preceding = preceding.rstrip()
+    if not preceding:
+        return True
+    if preceding[-1] in ")]" or preceding[-1] in "\"'`":
+        return False
+    word = re.search(r"[\w$]+$", preceding)
+    return word is None or word.group() in _REGEX_KEYWORDS
+
+
+def _tokens(pattern: re.Pattern, source: str) -> Iterator[Tuple[str, str]]:
+    """(kind, text) pieces of source, kind being "string", "comment", "space", "regex" or "code" """
+    position = 0
+    search_from = 0
+    while True:
+        match = pattern.search(source, search_from)
+        if match is None:
+            break
+        kind = ("string", "comment", "space", "regex")[match.lastindex - 1]
+        if kind == "regex" and not _regex_allowed(source[max(0, match.start() - 200):match.start()]):
+            search_from = match.start() + 1  # A division; carry on after the "/"
+            continue
+        if match.start() > position:
+            yield "code", source[position:match.start()]
+        yield kind, match.group()
+        position = search_from = match.end()
+    if position < len(source):
+        yield "code", source[position:]
+
+
+def minify_css(source: str) -> str:
+    """Drop comments, the whitespace CSS does not need and each block's last semicolon; strings are kept verbatim"""
+    pieces = []
+    code = []
+
+    def flush():
+        pieces.append(_CSS_PUNCTUATION.sub(lambda m: m.group(1) or m.group(2), ''.join(code)).replace(";}", "}"))
+        code.clear()
+
+    for kind, text in _tokens(_CSS_TOKENS, source):
+        if kind == "string":
+            flush()
+            pieces.append(text)
+        elif kind == "space":
+            code.append(" ")
+        elif kind == "code":
+            code.append(text)
+    flush()
+    return ''.join(pieces).strip()
+
+
+def minify_js(source: str) -> str:
+    """Drop comments, indentation and blank lines; strings, template literals and regexes are kept verbatim
+
+    Line breaks survive, so automatic semicolon insertion reads the code as before.
+    Names are not shortened.
+    """
+    pieces = []
+    for kind, text in _tokens(_JS_TOKENS, source):
+        if kind == "comment":
+            # A removed block comment still separates the tokens around it
+            pieces.append("\n" if "\n" in text or text.startswith("//") else " ")
+        elif kind == "space":
+            pieces.append("\n" if "\n" in text else " ")
+        else:
+            pieces.append(text)
+    lines = (line.strip() for line in ''.join(pieces).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def build_bundle(name: str, sources: List[str], directory: Path = WWW_DIR) -> str:
+    """Sources of one bundle concatenated and minified"""
+    minify = minify_css if name.endswith(".css") else minify_js
+    parts = [minify((Path(directory) / source).read_text(encoding="utf-8")) for source in sources]
+    # Each script ends its last statement, as it would in its own file
+    return ("\n" if name.endswith(".css") else ";\n").join(parts) + "\n"
+
+
+def check_script(path: Path) -> None:
+    """Raise ValueError if node is installed and rejects the script's syntax"""
+    node = shutil.which("node")
+    if node is None:
+        logger.warning(f"node not found; {path.name} is not syntax checked")
+        return
+    result = subprocess.run([node, "--check", str(path)], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(f"{path.name} is not valid JavaScript:\n{result.stderr.strip()}")
+
+
+def build_assets(directory: Path = WWW_DIR) -> Dict[str, str]:
+    """Write each bundle as dist/<name>.<hash>.<ext> plus the manifest; returns the manifest
+
+    Scripts are syntax checked first, so a minification bug fails the build instead of
+    shipping. Bundles of earlier builds are removed.
+    """
+    start_time = time.time()
+    directory = Path(directory)
+    dist = directory / DIST_DIR
+    dist.mkdir(exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        content = build_bundle(name, sources, directory).encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        stem, extension = name.rsplit(".", 1)
+        filename = f"{stem}.{digest}.{extension}"
+        (dist / filename).write_bytes(content)
+        if extension == "js":
+            try:
+                check_script(dist / filename)
+            except ValueError:
+                (dist / filename).unlink()
+                raise
+        manifest[name] = f"{DIST_DIR}/{filename}"
+        source_size = sum((directory / source).stat().st_size for source in sources)
+        logger.info(f"{manifest[name]}: {len(sources)} files, {source_size:,} -> {len(content):,} bytes")
+
+    current = {Path(path).name for path in manifest.values()}
+    for path in dist.iterdir():
+        # Drop old bundles along with their precompressed variants
+        bundle = path.name.removesuffix(".br").removesuffix(".gz")
+        if FINGERPRINTED_NAME.search(bundle) and bundle not in current:
+            path.unlink()
+
+    (dist / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    logger.info(f"Built {len(manifest)} bundles in {time.time() - start_time:.2f} seconds")
+    return manifest
+
+
+def load_manifest(directory: Path = WWW_DIR) -> Dict[str, str]:
+    """Bundle name -> fingerprinted path, or {} if the bundles are missing or older than their sources"""
+    directory = Path(directory)
+    manifest_path = directory / DIST_DIR / MANIFEST_NAME
+    if not manifest_path.exists():
+        logger.info("No asset bundles built; serving the source files")
+        return {}
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    built = manifest_path.stat().st_mtime
+    sources = [directory / source for name in BUNDLES for source in BUNDLES[name]]
+    if set(manifest) != set(BUNDLES) or any(not (directory / path).exists() for path in manifest.values()) \
+            or any(source.stat().st_mtime > built for source in sources):
+        logger.warning("Asset bundles are out of date; serving the source files until assets.py is run again")
+        return {}
+    return manifest
+
+
+def asset_tags(name: str, manifest: Dict[str, str]) -> List[ui.Tag]:
+    """<link> or <script> tags for a bundle: its fingerprinted file, or its sources without a build"""
+    paths = [manifest[name]] if name in manifest else BUNDLES[name]
+    if name.endswith(".css"):
+        return [ui.tags.link(rel="stylesheet", href=path) for path in paths]
+    return [ui.tags.script(src=path) for path in paths]
+
+
+def service_worker_script(manifest: Dict[str, str]) -> str:
+    """Service worker that precaches the fingerprinted bundles under a cache named after them"""
+    urls = sorted(f"/{path}" for path in manifest.values())
+    version = hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()[:HASH_LENGTH] if urls else "dev"
+    return f"""// Generated by assets.py from the asset manifest
+const CACHE_NAME = '{CACHE_PREFIX}-{version}';
+const PRECACHE_URLS = {json.dumps(urls)};
+
+self.addEventListener('install', function(event) {{
+    event.waitUntil(
+        caches.open(CACHE_NAME).then(function(cache) {{
+            return cache.addAll(PRECACHE_URLS);
+        }}).then(function() {{
+            return self.skipWaiting();
+        }})
+    );
+}});
+
+self.addEventListener('activate', function(event) {{
+    // Drop the caches of earlier builds
+    event.waitUntil(
+        caches.keys().then(function(names) {{
+            return Promise.all(names.filter(function(name) {{
+                return name.startsWith('{CACHE_PREFIX}-') && name !== CACHE_NAME;
+            }}).map(function(name) {{
+                return caches.delete(name);
+            }}));
+        }}).then(function() {{
+            return self.clients.claim();
+        }})
+    );
+}});
+
+self.addEventListener('fetch', function(event) {{
+    // Only the fingerprinted bundles come from the cache; the page, API data and the
+    // Shiny session always go to the network
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin ||
+            !PRECACHE_URLS.includes(url.pathname)) {{
+        return;
+    }}
+    event.respondWith(
+        caches.match(event.request).then(function(response) {{
+            return response || fetch(event.request);
+        }})
+    );
+}});
+"""
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Bundle, minify and fingerprint the static assets")
+    parser.add_argument("directory", type=Path, nargs="?", default=WWW_DIR, help="Static asset directory")
+    args = parser.parse_args()
+
+    build_assets(args.directory)
@@ -0,0 +1,109 @@
+import sqlite3
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def column_arrays(frame: pd.DataFrame, columns: Sequence[str]) -> List[list]:
+    """Turn DataFrame columns into plain Python lists SQLite can bind (NaN/NaT become NULL)"""
+    arrays = []
+    for col in columns:
+        values = frame[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime('%Y-%m-%d %H:%M:%S')
+        if values.hasnans:
+            values = values.astype(object).where(values.notna(), None)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        arrays.append(values.tolist())
+    return arrays
+
+
+class BulkWriter:
+    """Writes DataFrame chunks with prepared executemany statements and tracks rows/second per table"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._statements: Dict[tuple, str] = {}
+        self._rows: Dict[str, int] = {}
+        self._ignored: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+
+    def _statement(self, verb: str, table: str, columns: Sequence[str], conflict: str) -> str:
+        key = (verb, table, tuple(columns), conflict)
+        if key not in self._statements:
+            placeholders = ", ".join("?" for _ in columns)
+            self._statements[key] = (
+                f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) {conflict}".rstrip()
+            )
+        return self._statements[key]
+
+    def _execute(self, table: str, statement: str, rows: Iterable[tuple], count: int) -> None:
+        start_time = time.perf_counter()
+        changes = self.conn.total_changes
+        self.conn.executemany(statement, rows)
+        self._seconds[table] = self._seconds.get(table, 0.0) + time.perf_counter() - start_time
+        self._rows[table] = self._rows.get(table, 0) + count
+        # Rows INSERT OR IGNORE skipped because they conflicted with existing ones
+        self._ignored[table] = self._ignored.get(table, 0) + count - (self.conn.total_changes - changes)
+
+    def insert(self, table: str, frame: pd.DataFrame, columns: Optional[Sequence[str]] = None,
+               or_ignore: bool = False) -> None:
+        """INSERT (or INSERT OR IGNORE) every row of frame"""
+        if frame.empty:
+            return
+        columns = list(columns or frame.columns)
+        statement = self._statement("INSERT OR IGNORE" if or_ignore else "INSERT", table, columns, "")
+        self._execute(table, statement, zip(*column_arrays(frame, columns)), len(frame))
+
+    def upsert(self, table: str, frame: pd.DataFrame, key: Sequence[str],
+               columns: Optional[Sequence[str]] = None, update: Optional[Sequence[str]] = None) -> None:
+        """Insert rows, updating the `update` columns of rows whose key already exists"""
+        if frame.empty:
+            return
+        columns = list(columns or frame.columns)
+        update = [col for col in (update or columns) if col not in key]
+        conflict = (
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in update)
+        )
+        statement = self._statement("INSERT", table, columns, conflict)
+        self._execute(table, statement, zip(*column_arrays(frame, columns)), len(frame))
+
+    @contextmanager
+    def transaction(self):
+        """Group every write in the block into one transaction"""
+        self.conn.execute('BEGIN')
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def stats(self) -> pd.DataFrame:
+        """Rows written, rows ignored as duplicates, time spent and rows/second for each table"""
+        rows = [
+            {
+                "table": table,
+                "rows": count,
+                "ignored": self._ignored[table],
+                "seconds": round(self._seconds[table], 3),
+                "rows_per_second": int(count / self._seconds[table]) if self._seconds[table] else np.nan,
+            }
+            for table, count in self._rows.items()
+        ]
+        return pd.DataFrame(rows, columns=["table", "rows", "ignored", "seconds", "rows_per_second"])
+
+    def log_stats(self) -> None:
+        """Log write throughput per table"""
+        for row in self.stats().itertuples(index=False):
+            ignored = f", {row.ignored:,} already present" if row.ignored else ""
+            logger.info(f"{row.table}: {row.rows:,} rows in {row.seconds:.2f} seconds "
+                        f"({row.rows_per_second:,.0f} rows/second){ignored}")
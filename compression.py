@@ -0,0 +1,235 @@
+import gzip
+import logging
+import mimetypes
+import stat
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Pattern
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+WWW_DIR = Path(__file__).parent / "www"
+
+MINIMUM_SIZE = 1024  # Smaller responses gain less than the headers and CPU cost
+GZIP_LEVEL = 6  # Per-response levels trade ratio for latency; precompression uses the maximum
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+PRECOMPRESSED = [("br", ".br"), ("gzip", ".gz")]  # In order of preference
+STATIC_CACHE_CONTROL = "public, no-cache"  # Revalidate with the ETag
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"  # Content-hashed names change with the content
+
+
+def accepted_encodings(scope: Scope) -> set:
+    """Content codings the client accepts (q > 0) from its Accept-Encoding header"""
+    accepted = set()
+    for part in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def response_encoding(scope: Scope) -> Optional[str]:
+    """brotli when both sides support it, else gzip, else None"""
+    accepted = accepted_encodings(scope)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class _StreamCompressor:
+    """Incremental gzip or brotli compressor"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Compress HTML, JSON, CSS and JS responses with brotli or gzip, as Accept-Encoding allows
+
+    Responses that are already encoded (precompressed static files), small, or of other
+    types pass through unchanged. Websocket traffic is left to the server, which
+    negotiates permessage-deflate itself.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = response_encoding(scope)
+        start_message: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or start_message is None:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                compressible = is_compressible(headers.get("content-type", "")) \
+                    and "content-encoding" not in headers
+                if compressible and "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if not compressible or encoding is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                del headers["Content-Length"]
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                await send(start_message)
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more_body),
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedStatic:
+    """Serve files from a static directory, preferring their .br/.gz variants; other paths go to app
+
+    Variants are only used while they are at least as new as the original file.
+    Responses carry Vary: Accept-Encoding, an ETag and cache_control, or a one-year
+    immutable Cache-Control for paths matching the immutable pattern.
+    """
+
+    def __init__(self, app: ASGIApp, directory: Path = WWW_DIR, cache_control: str = STATIC_CACHE_CONTROL,
+                 immutable: Optional[Pattern[str]] = None):
+        self.app = app
+        self.static = StaticFiles(directory=str(directory))
+        self.cache_control = cache_control
+        self.immutable = immutable
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        path = self.static.get_path(scope)
+        full_path, stat_result = self.static.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode) or path.endswith((".br", ".gz")):
+            await self.app(scope, receive, send)
+            return
+
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        response = None
+        if is_compressible(content_type):
+            accepted = accepted_encodings(scope)
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding not in accepted:
+                    continue
+                variant_path, variant_stat = self.static.lookup_path(path + suffix)
+                if variant_stat is not None and variant_stat.st_mtime >= stat_result.st_mtime:
+                    response = self.static.file_response(variant_path, variant_stat, scope)
+                    response.headers["Content-Encoding"] = encoding
+                    break
+            response = response or self.static.file_response(full_path, stat_result, scope)
+            response.headers.add_vary_header("Accept-Encoding")
+        else:
+            response = self.static.file_response(full_path, stat_result, scope)
+        response.headers["Content-Type"] = content_type
+        fingerprinted = self.immutable is not None and self.immutable.search(path)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else self.cache_control
+        await response(scope, receive, send)
+
+
+def precompress_assets(directory: Path = WWW_DIR) -> int:
+    """Write .gz and (with brotli installed) .br files next to each compressible asset; returns files written"""
+    start_time = time.time()
+    written = 0
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or path.suffix in (".gz", ".br") or not is_compressible(
+                mimetypes.guess_type(path.name)[0] or ""):
+            continue
+        data = path.read_bytes()
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            target = path.with_name(path.name + suffix)
+            if len(compressed) >= len(data):
+                # Not worth serving; drop a stale variant so the original is used
+                target.unlink(missing_ok=True)
+                continue
+            target.write_bytes(compressed)
+            written += 1
+            logger.info(f"{target.relative_to(directory)}: {len(data):,} -> {len(compressed):,} bytes")
+    logger.info(f"Precompressed {written} files in {time.time() - start_time:.2f} seconds")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Precompress static assets for PrecompressedStatic")
+    parser.add_argument("directory", type=Path, nargs="?", default=WWW_DIR, help="Static asset directory")
+    args = parser.parse_args()
+
+    if brotli is None:
+        logger.warning("brotli is not installed; writing .gz variants only")
+    precompress_assets(args.directory)
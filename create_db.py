@@ -4,176 +4,577 @@ from pathlib import Path
 import os
 import numpy as np
 from datetime import datetime
+import hashlib
 import logging
+import time
+
+from bulk_writer import BulkWriter
+from csv_blocks import compression_of, default_workers, iter_parsed_blocks, open_source, read_header
+from loaders import CLEANED_DTYPES, review_datetimes
+from normalize import normalize_text, token_text
+from reshape import iter_long_blocks
+from metrics import ENGINES, build_product_metrics, refresh_product_metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FINGERPRINT_BYTES = 64 * 1024  # Bytes before the high-water offset that must be unchanged to append
+SWAP_BUSY_TIMEOUT_MS = 10000  # How long each WAL checkpoint before a swap waits for readers
+SWAP_CHECKPOINT_ATTEMPTS = 3
+
+# The legend's types, except price: SQLite stores REAL, and a float32 1.99 would be
+# written as 1.9900000095367432
+INGEST_DTYPES = {**CLEANED_DTYPES, 'price': 'float64'}
+
 def process_chunk(chunk):
     """Process a chunk of data with basic cleaning"""
     chunk = chunk.copy()
     
-    # Clean text fields
+    # Clean text fields: drop invisible characters, collapse whitespace and trim
     text_columns = ['title', 'category', 'description', 'review_summary', 'review_text']
     for col in text_columns:
-        chunk[col] = chunk[col].fillna('').astype(str).str.strip()
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            # Normalize each distinct value once; code -1 (missing) picks the trailing ''
+            categories = pd.Series(chunk[col].cat.categories.astype(str))
+            cleaned = np.append(normalize_text(categories).to_numpy(dtype=object), '')
+            chunk[col] = pd.Categorical(cleaned[chunk[col].cat.codes.to_numpy()])
+        else:
+            chunk[col] = normalize_text(chunk[col].astype(object)).fillna('').astype(str)
+    # Lowercased letters, digits and single spaces, ready to split into words
+    chunk['review_tokens'] = token_text(chunk['review_text'])
     
     # Clean numeric fields
     chunk['price'] = pd.to_numeric(chunk['price'], errors='coerce')
     chunk['review_rating'] = pd.to_numeric(chunk['review_rating'], errors='coerce')
     
-    # Convert timestamps
-    chunk['review_timestamp'] = pd.to_datetime(chunk['review_timestamp'])
+    # Timestamps are INT32 epoch seconds
+    chunk['review_timestamp'] = review_datetimes(chunk['review_timestamp'])
+    
+    # First half of the dedup key; the user is mixed in once ids are assigned
+    chunk['content_hash'] = content_digests(chunk)
     
     return chunk
 
-def create_db():
-    """Create and initialize the database with product and review data"""
+def content_digests(chunk):
+    """8-byte blake2b of each review's product title, timestamp and text, as signed 64-bit ints"""
+    epochs = chunk['review_timestamp'].to_numpy(dtype='datetime64[s]').astype('int64')
+    return pd.Series([
+        int.from_bytes(hashlib.blake2b(f'{title}\x1f{epoch}\x1f{text}'.encode('utf-8'), digest_size=8).digest(),
+                       'big', signed=True)
+        for title, epoch, text in zip(chunk['title'].astype(str), epochs, chunk['review_text'])
+    ], index=chunk.index, dtype='int64')
+
+def with_user(digests, user_ids):
+    """Combine content digests with integer user ids into the final content_hash
+
+    The user id goes through the splitmix64 finalizer so neighbouring ids flip
+    unrelated bits; numpy's uint64 arithmetic wraps like the reference algorithm.
+    """
+    x = user_ids.fillna(0).to_numpy(dtype='uint64') + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return pd.Series((digests.to_numpy(dtype='int64').view('uint64') ^ x).view('int64'), index=digests.index)
+
+def intern_products(writer, product_ids, chunk, upsert=False):
+    """Map product titles to integer ids, adding products seen for the first time
+
+    With upsert=True products already in the database take the chunk's category,
+    description and price, so an append picks up changed product details.
+    """
+    products = chunk[['title', 'category', 'description', 'price']].drop_duplicates(
+        'title', keep='last' if upsert else 'first')
+    known = products['title'].map(product_ids)
+    new_products = products[known.isna()]
+    if len(new_products):
+        start_id = len(product_ids) + 1
+        new_products = new_products.assign(product_id=range(start_id, start_id + len(new_products)))
+        product_ids.update(zip(new_products['title'], new_products['product_id']))
+    if upsert:
+        products = products.assign(product_id=products['title'].map(product_ids))
+        writer.upsert('products', products, key=['title'],
+                      columns=['product_id', 'title', 'category', 'description', 'price'],
+                      update=['category', 'description', 'price'])
+    else:
+        writer.insert('products', new_products,
+                      columns=['product_id', 'title', 'category', 'description', 'price'], or_ignore=True)
+    return chunk['title'].map(product_ids)
+
+def track_changed_products(cursor):
+    """Record products whose details an append changes, with the category they had before
+
+    A temp trigger fills the changed_products table, so a product that moved category
+    refreshes the metrics of the category it left as well. The table is part of the
+    database, so an interrupted append's changes are still refreshed by the re-run.
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS changed_products '
+                   '(product_id INTEGER PRIMARY KEY, old_category TEXT)')
+    cursor.execute('''
+    CREATE TEMP TRIGGER IF NOT EXISTS product_details_changed
+    AFTER UPDATE OF category, description, price ON main.products
+    WHEN OLD.category IS NOT NEW.category OR OLD.description IS NOT NEW.description
+        OR OLD.price IS NOT NEW.price
+    BEGIN
+        INSERT OR IGNORE INTO changed_products VALUES (OLD.product_id, OLD.category);
+    END''')
+
+def clear_pending_refresh(cursor):
+    """Forget the products an append still had to refresh; called once their refresh is committed"""
+    cursor.execute("DELETE FROM ingest_state WHERE key = 'append_review_id'")
+    cursor.execute('DELETE FROM changed_products')
+
+def intern_users(writer, user_ids, source_ids):
+    """Map source user ids to integer ids, adding unseen users to the users table"""
+    unseen = source_ids.notna() & source_ids.map(user_ids).isna()
+    new_users = pd.unique(source_ids[unseen])
+    if len(new_users):
+        start_id = len(user_ids) + 1
+        users = pd.DataFrame({
+            'user_id': range(start_id, start_id + len(new_users)),
+            'source_user_id': new_users
+        })
+        writer.insert('users', users)
+        user_ids.update(zip(users['source_user_id'], users['user_id']))
+    return source_ids.map(user_ids)
+
+def load_state(cursor):
+    """Read the ingest high-water mark saved by the previous build"""
+    return dict(cursor.execute('SELECT key, value FROM ingest_state').fetchall())
+
+def save_state(cursor, **values):
+    """Record ingest progress; called inside the chunk's transaction so data and state agree"""
+    cursor.executemany(
+        'INSERT INTO ingest_state (key, value) VALUES (?, ?) '
+        'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+        [(key, str(value)) for key, value in values.items()]
+    )
+
+def source_fingerprint(csv_path, offset):
+    """Hash of the header line and the bytes just before offset, to recognise an appended-to export"""
+    digest = hashlib.sha256()
+    with open_source(csv_path) as f:
+        digest.update(f.readline())
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+# The per-product correlated subqueries this replaced; kept for benchmark_aggregates()
+CORRELATED_AGGREGATES = '''
+    UPDATE products 
+    SET review_count = (
+        SELECT COUNT(*) 
+        FROM reviews 
+        WHERE reviews.product_id = products.product_id
+    ),
+    avg_rating = (
+        SELECT AVG(review_rating) 
+        FROM reviews 
+        WHERE reviews.product_id = products.product_id
+    )
+'''
+
+def update_product_aggregates(cursor, product_ids=None):
+    """Recompute review_count and avg_rating, for every product or only the given ones
+
+    One grouped pass over reviews joined back to products, instead of two
+    subqueries per product that each scan reviews.
+    """
+    where = ''
+    if product_ids is not None:
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS touched_products (product_id INTEGER PRIMARY KEY)')
+        cursor.execute('DELETE FROM touched_products')
+        cursor.executemany('INSERT INTO touched_products VALUES (?)', ((int(pid),) for pid in product_ids))
+        where = 'WHERE product_id IN (SELECT product_id FROM touched_products)'
+    cursor.execute(f'''
+    UPDATE products 
+    SET review_count = agg.review_count,
+        avg_rating = agg.avg_rating
+    FROM (
+        SELECT product_id, COUNT(*) AS review_count, AVG(review_rating) AS avg_rating
+        FROM reviews
+        {where}
+        GROUP BY product_id
+    ) AS agg
+    WHERE products.product_id = agg.product_id
+    ''')
+
+def benchmark_aggregates(db_path, sizes=(2500, 5000, 10000, 20000)):
+    """Time the correlated and grouped aggregate updates on growing samples of a built database"""
+    results = []
+    for size in sizes:
+        for method in ('correlated', 'grouped'):
+            # Fresh in-memory copy without indexes, as during a build
+            conn = sqlite3.connect(':memory:')
+            conn.execute('ATTACH DATABASE ? AS src', (str(db_path),))
+            conn.execute('CREATE TABLE reviews AS SELECT product_id, review_rating FROM src.reviews '
+                         'ORDER BY review_id LIMIT ?', (size,))
+            conn.execute('''CREATE TABLE products AS SELECT product_id, 0 AS review_count, 0.0 AS avg_rating
+                            FROM src.products WHERE product_id IN (SELECT product_id FROM reviews)''')
+            cursor = conn.cursor()
+            start_time = time.perf_counter()
+            if method == 'correlated':
+                cursor.execute(CORRELATED_AGGREGATES)
+            else:
+                update_product_aggregates(cursor)
+            elapsed = time.perf_counter() - start_time
+            products = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+            conn.close()
+            results.append({'method': method, 'reviews': size, 'products': products,
+                            'seconds': round(elapsed, 4)})
+    return pd.DataFrame(results)
+
+def create_tables(cursor):
+    """Drop any previous build and create empty tables"""
+    cursor.execute('''DROP TABLE IF EXISTS products''')
+    cursor.execute('''DROP TABLE IF EXISTS reviews''')
+    cursor.execute('''DROP TABLE IF EXISTS users''')
+    cursor.execute('''DROP TABLE IF EXISTS temp_products''')
+    cursor.execute('''DROP TABLE IF EXISTS ingest_state''')
+    
+    cursor.execute('''
+    CREATE TABLE products (
+        product_id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        category TEXT,
+        description TEXT,
+        price REAL,
+        review_count INTEGER DEFAULT 0,
+        avg_rating REAL DEFAULT 0
+    )''')
+    
+    cursor.execute('''
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        source_user_id TEXT NOT NULL UNIQUE
+    )''')
+    
+    cursor.execute('''
+    CREATE TABLE reviews (
+        review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        user_id INTEGER,
+        review_summary TEXT,
+        review_rating REAL,
+        review_text TEXT,
+        review_tokens TEXT,
+        review_timestamp TIMESTAMP,
+        content_hash INTEGER NOT NULL,
+        FOREIGN KEY (product_id) REFERENCES products(product_id),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    
+    # Exist before loading so INSERT OR IGNORE drops repeated reviews as they arrive, and
+    # appends can upsert products by title
+    cursor.execute('CREATE UNIQUE INDEX idx_review_content_hash ON reviews(content_hash)')
+    cursor.execute('CREATE UNIQUE INDEX idx_product_title_key ON products(title)')
+    
+    # High-water mark of the last ingest, used by append mode
+    cursor.execute('''
+    CREATE TABLE ingest_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )''')
+
+def has_ingest_state(db_path):
+    """Whether db_path is a database built by create_db that can be appended to"""
+    if not Path(db_path).exists():
+        return False
+    conn = sqlite3.connect(str(db_path))
+    try:
+        has_state = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ingest_state'"
+        ).fetchone() is not None
+        review_columns = [row[1] for row in conn.execute('PRAGMA table_info(reviews)')]
+        return has_state and 'content_hash' in review_columns
+    finally:
+        conn.close()
+
+def load_build_phase(db_path):
+    """Checkpointed phase of a build file: 'load', 'finalize' or 'done'"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return load_state(conn.cursor()).get('phase')
+    finally:
+        conn.close()
+
+def swap_into_place(build_path, db_path):
+    """Atomically replace the live database with a finished build
+
+    The old file's WAL is checkpointed and truncated first, so a leftover -wal
+    can never be replayed into the new file by the next connection. If readers keep
+    it busy through every attempt the swap is refused and the build file is kept,
+    so it can be swapped in later with --resume.
+    """
+    if Path(db_path).exists():
+        conn = sqlite3.connect(str(db_path))
+        try:
+            conn.execute(f'PRAGMA busy_timeout={SWAP_BUSY_TIMEOUT_MS}')
+            for attempt in range(1, SWAP_CHECKPOINT_ATTEMPTS + 1):
+                busy, _, _ = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+                if not busy:
+                    break
+                logger.warning(f"Readers kept {db_path} busy; WAL checkpoint attempt {attempt} "
+                               f"of {SWAP_CHECKPOINT_ATTEMPTS} could not truncate it")
+            else:
+                raise RuntimeError(f"Could not truncate the WAL of {db_path}; {build_path} was left in place")
+        finally:
+            conn.close()
+    os.replace(build_path, db_path)
+    logger.info(f"Swapped {build_path} into place as {db_path}")
+
+def create_db(metrics_engine="sqlite", workers=1, append=False, raw_path=None, resume=False, csv_path=None):
+    """Create and initialize the database with product and review data
+
+    A full build loads into amazon_reviews.db.building with bulk-load settings, adds
+    indexes and statistics after the data, and then renames it over the live file, so
+    readers only ever see a complete database.
+    
+    With append=True an existing database is kept and only rows past the saved
+    high-water mark are ingested; touched products and their categories' metrics
+    are then refreshed instead of rebuilding everything.
+    
+    raw_path reads the wide purchase_history export directly, reshaping it block by
+    block instead of going through cleaned_purchase_history.csv. Either input may be
+    gzip or zstd compressed; it is decompressed in a thread while blocks are parsed.
+    
+    Every committed chunk checkpoints its byte offset, row count and build phase in
+    ingest_state. With resume=True an interrupted full build continues from the
+    build file's last checkpoint instead of starting over.
+    """
     try:
         logger.info("Starting database creation")
         db_path = Path(__file__).parent / "amazon_reviews.db"
-        csv_path = Path(__file__).parent / "cleaned_purchase_history.csv"
+        csv_path = Path(raw_path or csv_path or Path(__file__).parent / "cleaned_purchase_history.csv")
         
-        # Create database connection with optimized settings
-        conn = sqlite3.connect(str(db_path), isolation_level=None)
-        cursor = conn.cursor()
+        if append and not has_ingest_state(db_path):
+            logger.info("No previous ingest state found, running a full build")
+            append = False
+        if append and resume:
+            # Appends checkpoint every chunk into the live database; re-running --append resumes
+            resume = False
         
-        # Enable WAL mode for better concurrent access
-        cursor.execute('PRAGMA journal_mode=WAL')
-        cursor.execute('PRAGMA synchronous=NORMAL')
+        if append:
+            # Appends are small transactions against the live database
+            build_path = db_path
+            conn = sqlite3.connect(str(db_path), isolation_level=None)
+            cursor = conn.cursor()
+            
+            # Enable WAL mode for better concurrent access
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            # Databases built before products were upserted by title lack the key, and
+            # before tokens were stored the column
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_product_title_key ON products(title)')
+            if 'review_tokens' not in [row[1] for row in cursor.execute('PRAGMA table_info(reviews)')]:
+                cursor.execute('ALTER TABLE reviews ADD COLUMN review_tokens TEXT')
+        else:
+            # Full builds go to a private file that replaces the live one when complete,
+            # so nothing needs locking against readers or syncing while it loads
+            build_path = db_path.with_name(db_path.name + '.building')
+            if resume and not (has_ingest_state(build_path) and
+                               load_build_phase(build_path) in ('load', 'finalize', 'done')):
+                logger.info(f"No interrupted build to resume in {build_path.name}, starting over")
+                resume = False
+            if not resume:
+                for leftover in (build_path, build_path.with_name(build_path.name + '-journal')):
+                    if leftover.exists():
+                        leftover.unlink()
+            conn = sqlite3.connect(str(build_path), isolation_level=None)
+            cursor = conn.cursor()
+            # A rollback journal keeps every chunk commit atomic, so checkpoints survive a
+            # crash; pages past the original end of file (nearly all of a load) are not journaled
+            cursor.execute('PRAGMA journal_mode=TRUNCATE')
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA locking_mode=EXCLUSIVE')
         cursor.execute('PRAGMA cache_size=-2000000')  # Use 2GB cache
         cursor.execute('PRAGMA temp_store=MEMORY')
+        if append:
+            # After temp_store, which discards temp tables
+            track_changed_products(cursor)
         
-        # Create tables with optimized schema
-        cursor.execute('''DROP TABLE IF EXISTS products''')
-        cursor.execute('''DROP TABLE IF EXISTS reviews''')
-        cursor.execute('''DROP TABLE IF EXISTS temp_products''')
+        total_bytes = csv_path.stat().st_size
+        # Offsets count uncompressed bytes; in compressed input, reaching one means decompressing up to it
+        compressed = compression_of(csv_path) is not None
+        product_ids = {}
+        user_ids = {}
+        min_timestamp = None
+        max_timestamp = None
+        rows_done = 0
+        phase = 'load'
         
-        # Create a temporary table for products
-        cursor.execute('''
-        CREATE TABLE temp_products (
-            title TEXT PRIMARY KEY,
-            category TEXT,
-            description TEXT,
-            price REAL
-        )''')
+        if append or resume:
+            state = load_state(cursor)
+            product_ids = dict(cursor.execute('SELECT title, product_id FROM products').fetchall())
+            user_ids = dict(cursor.execute('SELECT source_user_id, user_id FROM users').fetchall())
+            offset = int(state.get('source_offset', 0))
+            if state.get('max_review_timestamp'):
+                max_timestamp = pd.Timestamp(state['max_review_timestamp'])
         
-        cursor.execute('''
-        CREATE TABLE products (
-            title TEXT PRIMARY KEY,
-            category TEXT,
-            description TEXT,
-            price REAL,
-            review_count INTEGER DEFAULT 0,
-            avg_rating REAL DEFAULT 0
-        )''')
+        if resume:
+            phase = state['phase']
+            rows_done = int(state.get('rows_written', 0))
+            if phase == 'done':
+                # Interrupted between finishing the build and swapping it in
+                conn.close()
+                swap_into_place(build_path, db_path)
+                logger.info("Database creation completed successfully!")
+                return
+            if 'source_offset' in state:
+                if not state.get('source_fingerprint'):
+                    logger.warning(f"Chunk checkpoints of compressed input are not fingerprinted; "
+                                   f"assuming {csv_path.name} is unchanged")
+                elif state.get('source_fingerprint') != source_fingerprint(csv_path, offset):
+                    raise ValueError(f"{csv_path.name} changed since the last checkpoint; rebuild without --resume")
+                if raw_path is not None and phase == 'load':
+                    raise ValueError("Wide exports can only be ingested from the beginning; rebuild without --resume")
+                start_offset = offset
+            else:
+                # Interrupted before the first chunk was committed
+                start_offset = None
+            logger.info(f"Resuming {build_path.name} in phase '{phase}' from byte {offset:,} "
+                        f"({rows_done:,} rows already written)")
+        elif append:
+            rows_done = int(state.get('rows_written', 0))
+            # Reviews past this id are the ones this append inserts. It is kept until the refresh
+            # commits, so re-running an interrupted append also refreshes the chunks it committed.
+            if 'append_review_id' not in state:
+                state['append_review_id'] = cursor.execute(
+                    'SELECT IFNULL(MAX(review_id), 0) FROM reviews').fetchone()[0]
+                save_state(cursor, append_review_id=state['append_review_id'])
+            else:
+                logger.info("Resuming an interrupted append; its reviews are refreshed as well")
+            last_review_id = int(state['append_review_id'])
+            in_range = 0 < offset and (compressed or offset <= total_bytes)
+            if raw_path is not None:
+                # Wide rows are numbered from the start of the export, so it is always rescanned;
+                # reviews already loaded are dropped by the content_hash index
+                start_offset = None
+                logger.info(f"Rescanning {csv_path.name}; reviews already loaded are skipped")
+            elif in_range and state.get('source_fingerprint') == source_fingerprint(csv_path, offset):
+                # Same export with rows appended: continue right after the last ingested record
+                start_offset = offset
+                logger.info(f"Appending from byte {start_offset:,} of {csv_path.name}")
+            else:
+                # A different export: rescan it, keeping reviews from the high-water mark on;
+                # those already loaded at that timestamp are dropped by the content_hash index
+                start_offset = None
+                min_timestamp = max_timestamp
+                if min_timestamp is not None:
+                    logger.info(f"Source changed, ingesting reviews from {min_timestamp}")
+                else:
+                    logger.info("Source changed, rescanning it; reviews already loaded are skipped")
+        else:
+            create_tables(cursor)
+            start_offset = None
+            save_state(cursor, phase='load', rows_written=0)
         
-        cursor.execute('''
-        CREATE TABLE reviews (
-            review_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            user_id TEXT,
-            review_summary TEXT,
-            review_rating REAL,
-            review_text TEXT,
-            review_timestamp TIMESTAMP,
-            FOREIGN KEY (title) REFERENCES products(title)
-        )''')
+        # Stream the CSV once in record-aligned byte ranges. Worker processes parse and
+        # clean the ranges, and this process is the only one writing to SQLite.
+        writer = BulkWriter(conn)
         
-        # Process data in chunks to manage memory
-        chunk_size = 50000
-        total_rows = sum(1 for _ in open(csv_path, 'r', encoding='utf-8')) - 1  # subtract header
-        total_chunks = (total_rows + chunk_size - 1) // chunk_size
-        
-        logger.info(f"Processing {total_rows:,} rows in chunks of {chunk_size:,}")
-        
-        # First pass: collect unique products
-        logger.info("First pass: Collecting unique products...")
-        for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunk_size), 1):
-            logger.info(f"Processing products from chunk {i}/{total_chunks}")
-            chunk = process_chunk(chunk)
+        if phase == 'load':
+            logger.info(f"Processing {total_bytes / 1024 ** 2:,.1f} MB with {workers} parser process(es)")
             
-            # Insert products into temporary table
-            products_data = chunk[['title', 'category', 'description', 'price']].drop_duplicates('title', keep='first')
+            with open_source(csv_path) as csv_file:
+                if raw_path is not None:
+                    blocks = iter_long_blocks(csv_file, clean=process_chunk, workers=workers, start=start_offset)
+                else:
+                    columns = read_header(csv_file)
+                    if start_offset is not None:
+                        csv_file.seek(start_offset)
+                    dtype = {col: INGEST_DTYPES[col] for col in columns if col in INGEST_DTYPES}
+                    blocks = iter_parsed_blocks(csv_file, columns, start=csv_file.tell(), dtype=dtype,
+                                                clean=process_chunk, workers=workers)
+                for i, (start, end, chunk) in enumerate(blocks, 1):
+                    if min_timestamp is not None:
+                        chunk = chunk[chunk['review_timestamp'] >= min_timestamp].copy()
+                    
+                    # One transaction per chunk; products first, so the chunk's reviews
+                    # can reference their integer ids
+                    with writer.transaction():
+                        chunk['product_id'] = intern_products(writer, product_ids, chunk, upsert=append)
+                        chunk['user_id'] = intern_users(writer, user_ids, chunk['user_id'])
+                        chunk['content_hash'] = with_user(chunk['content_hash'], chunk['user_id'])
+                        # Reviews already in the database (re-runs, overlapping exports) are skipped
+                        writer.insert('reviews', chunk, columns=[
+                            'product_id', 'user_id', 'review_summary', 'review_rating',
+                            'review_text', 'review_tokens', 'review_timestamp', 'content_hash'
+                        ], or_ignore=True)
+                        
+                        chunk_max = chunk['review_timestamp'].max()
+                        if pd.notna(chunk_max) and (max_timestamp is None or chunk_max > max_timestamp):
+                            max_timestamp = chunk_max
+                        rows_done += len(chunk)
+                        # Checkpoint in the chunk's own transaction, so data and checkpoint agree
+                        save_state(cursor, source_offset=end, rows_written=rows_done,
+                                   source_fingerprint='' if compressed else source_fingerprint(csv_path, end),
+                                   max_review_timestamp=max_timestamp if max_timestamp is not None else '')
+                    
+                    progress = "" if compressed else f" ({end / total_bytes if total_bytes else 1.0:.0%} of input)"
+                    logger.info(f"Completed chunk {i} (bytes {start:,}-{end:,}): {rows_done:,} rows, "
+                                f"{len(product_ids):,} products{progress}")
+                
+                end_offset = csv_file.tell()
             
-            # Insert products in smaller batches
-            batch_size = 500
-            for start_idx in range(0, len(products_data), batch_size):
-                end_idx = min(start_idx + batch_size, len(products_data))
-                batch = products_data.iloc[start_idx:end_idx]
-                try:
-                    batch.to_sql('temp_products', conn, if_exists='append', index=False, method='multi')
-                except sqlite3.IntegrityError:
-                    # Handle duplicates by inserting one by one
-                    for _, row in batch.iterrows():
-                        try:
-                            cursor.execute('''
-                            INSERT OR IGNORE INTO temp_products (title, category, description, price)
-                            VALUES (?, ?, ?, ?)
-                            ''', (row['title'], row['category'], row['description'], row['price']))
-                        except Exception as e:
-                            logger.warning(f"Failed to insert product {row['title']}: {str(e)}")
-            
-            conn.commit()
-        
-        # Move unique products to final table
-        logger.info("Moving unique products to final table...")
-        cursor.execute('''
-        INSERT INTO products (title, category, description, price)
-        SELECT title, category, description, MIN(price) as price
-        FROM temp_products
-        GROUP BY title, category, description
-        ''')
+            writer.log_stats()
+            with writer.transaction():
+                save_state(cursor, source_offset=end_offset,
+                           source_fingerprint=source_fingerprint(csv_path, end_offset))
+                if not append:
+                    save_state(cursor, phase='finalize')
         
-        # Drop temporary table
-        cursor.execute('DROP TABLE temp_products')
-        
-        # Second pass: process reviews
-        logger.info("Second pass: Processing reviews...")
-        for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunk_size), 1):
-            logger.info(f"Processing reviews from chunk {i}/{total_chunks}")
-            chunk = process_chunk(chunk)
-            
-            # Insert reviews in batches
-            reviews_data = chunk[[
-                'title', 'user_id', 'review_summary', 'review_rating',
-                'review_text', 'review_timestamp'
-            ]]
-            
-            # Insert reviews in smaller batches
-            batch_size = 10000
-            for start_idx in range(0, len(reviews_data), batch_size):
-                end_idx = min(start_idx + batch_size, len(reviews_data))
-                batch = reviews_data.iloc[start_idx:end_idx]
-                batch.to_sql('reviews', conn, if_exists='append', index=False, method='multi')
-            
-            conn.commit()
-            logger.info(f"Completed chunk {i}/{total_chunks}")
+        if append:
+            # Only products that received new reviews or changed details, and their categories, change
+            touched_products = [row[0] for row in cursor.execute(
+                'SELECT product_id FROM reviews WHERE review_id > ? '
+                'UNION SELECT product_id FROM changed_products', (last_review_id,)
+            )]
+            if not touched_products:
+                clear_pending_refresh(cursor)
+                logger.info("No new reviews or product changes, database is up to date")
+                return
+            logger.info(f"Updating metrics for {len(touched_products):,} touched products...")
+            with writer.transaction():
+                update_product_aggregates(cursor, touched_products)
+                categories = [row[0] for row in cursor.execute(
+                    'SELECT category FROM products '
+                    'WHERE product_id IN (SELECT product_id FROM touched_products) '
+                    'UNION SELECT old_category FROM changed_products'
+                )]
+                refresh_product_metrics(conn, categories)
+                clear_pending_refresh(cursor)
+            logger.info("Database append completed successfully!")
+            return
         
         # Calculate and update product metrics
         logger.info("Calculating product metrics...")
-        cursor.execute('''
-        UPDATE products 
-        SET review_count = (
-            SELECT COUNT(*) 
-            FROM reviews 
-            WHERE reviews.title = products.title
-        ),
-        avg_rating = (
-            SELECT AVG(review_rating) 
-            FROM reviews 
-            WHERE reviews.title = products.title
-        )
-        ''')
+        update_product_aggregates(cursor)
         
         # Create indices for better query performance
         logger.info("Creating indices...")
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_title ON reviews(title)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_product ON reviews(product_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_user ON reviews(user_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_rating ON reviews(review_rating)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_rating ON products(avg_rating DESC)')
         
-        conn.commit()
+        # Build the serving metrics table, optionally with the DuckDB engine
+        logger.info(f"Building product_metrics_mv with {metrics_engine}...")
+        if metrics_engine != "sqlite":
+            # Let the other engine open the file; the lock is released on the next access
+            cursor.execute('PRAGMA locking_mode=NORMAL')
+            cursor.execute('SELECT COUNT(*) FROM products').fetchone()
+        build_product_metrics(conn, db_path=build_path, engine=metrics_engine)
+        
+        logger.info("Analyzing...")
+        cursor.execute('ANALYZE')
+        save_state(cursor, phase='done')
+        # Serve the snapshot in WAL mode, like the live database
+        cursor.execute('PRAGMA locking_mode=NORMAL')
+        cursor.execute('PRAGMA journal_mode=WAL')
+        conn.close()
+        
+        swap_into_place(build_path, db_path)
         logger.info("Database creation completed successfully!")
         
     except Exception as e:
@@ -184,4 +585,27 @@ def create_db():
             conn.close()
 
 if __name__ == "__main__":
-    create_db()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build amazon_reviews.db from cleaned_purchase_history.csv")
+    parser.add_argument("--metrics-engine", choices=ENGINES, default="sqlite",
+                        help="Engine used to aggregate product_metrics_mv (duckdb runs it in parallel)")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Processes parsing and cleaning CSV ranges (1 parses in this process)")
+    parser.add_argument("--append", action="store_true",
+                        help="Ingest only rows added since the last build instead of rebuilding")
+    parser.add_argument("--benchmark-aggregates", action="store_true",
+                        help="Compare the correlated and grouped review_count/avg_rating updates on the built database")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted full build from its last checkpoint")
+    parser.add_argument("--raw", type=Path,
+                        help="Ingest a wide purchase_history export directly instead of the cleaned CSV")
+    parser.add_argument("--csv", type=Path,
+                        help="Cleaned CSV to ingest instead of cleaned_purchase_history.csv (.gz/.zst are streamed)")
+    args = parser.parse_args()
+    
+    if args.benchmark_aggregates:
+        print(benchmark_aggregates(Path(__file__).parent / "amazon_reviews.db").to_string(index=False))
+    else:
+        create_db(metrics_engine=args.metrics_engine, workers=args.workers, append=args.append, raw_path=args.raw,
+                  resume=args.resume, csv_path=args.csv)
\ No newline at end of file
@@ -0,0 +1,220 @@
+import gzip
+import io
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from loaders import read_csv_typed
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 16 * 1024 * 1024  # Bytes of CSV handed to one parser at a time
+PIECE_SIZE = 4 * 1024 * 1024  # Bytes decompressed per step by the reader thread
+READ_AHEAD = 8  # Decompressed pieces the reader thread may queue ahead of the parser
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+
+
+def compression_of(path) -> Optional[str]:
+    """'gzip', 'zstd' or None, from the file extension or else the first bytes"""
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix in COMPRESSED_SUFFIXES:
+        return COMPRESSED_SUFFIXES[suffix]
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+
+class DecompressingReader(io.RawIOBase):
+    """Raw stream over a decompressor that runs in its own thread
+
+    The thread keeps up to READ_AHEAD pieces decompressed while the caller parses, and
+    zlib/zstd release the GIL while they work. Positions are in uncompressed bytes;
+    seeking is forward only, by decompressing and discarding.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._queue: queue.Queue = queue.Queue(maxsize=READ_AHEAD)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b'')
+        self._position = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._pump, name='decompress', daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        try:
+            while not self._stop.is_set():
+                piece = self._stream.read(PIECE_SIZE)
+                self._put(piece)
+                if not piece:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buffer and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                raise item
+            self._eof = not item
+            self._buffer = memoryview(item)
+        count = min(len(b), len(self._buffer))
+        b[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        self._position += count
+        return count
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("compressed sources cannot seek from the end")
+        if offset < self._position:
+            raise io.UnsupportedOperation("compressed sources can only seek forward")
+        scratch = bytearray(min(PIECE_SIZE, offset - self._position))
+        while self._position < offset:
+            view = memoryview(scratch)[:min(len(scratch), offset - self._position)]
+            if not self.readinto(view):
+                break
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def open_source(path) -> BinaryIO:
+    """Open a CSV for binary streaming, decompressing gzip or zstd input in a background thread"""
+    compression = compression_of(path)
+    if compression is None:
+        return open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True,
+                                                             read_across_frames=True)
+    else:
+        stream = gzip.open(path, 'rb')
+    logger.info(f"Streaming {compression}-compressed input from {path}")
+    return io.BufferedReader(DecompressingReader(stream), buffer_size=PIECE_SIZE)
+
+
+def read_header(stream: BinaryIO) -> List[str]:
+    """Read the CSV header line and return the column names"""
+    line = stream.readline()
+    return pd.read_csv(io.BytesIO(line), nrows=0).columns.tolist()
+
+
+def _record_boundary(buf: bytes) -> int:
+    """Offset just past the last newline in buf that ends a record, or -1
+
+    buf always starts on a record boundary, so a newline ends a record when the number
+    of quote characters before it is even (escaped quotes are doubled and cancel out).
+    """
+    quotes = buf.count(b'"')
+    pos = len(buf)
+    while True:
+        newline = buf.rfind(b'\n', 0, pos)
+        if newline < 0:
+            return -1
+        if (quotes - buf.count(b'"', newline)) % 2 == 0:
+            return newline + 1
+        pos = newline
+
+
+def iter_record_blocks(stream: BinaryIO, start: int, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield (start, end, data) byte ranges of whole CSV records read sequentially from stream"""
+    pending = b''
+    offset = start
+    while True:
+        data = stream.read(block_size)
+        if not data:
+            break
+        buf = pending + data
+        boundary = _record_boundary(buf)
+        if boundary <= 0:
+            # A single record larger than the block; keep reading
+            pending = buf
+            continue
+        yield offset, offset + boundary, buf[:boundary]
+        offset += boundary
+        pending = buf[boundary:]
+    if pending.strip():
+        yield offset, offset + len(pending), pending
+
+
+def parse_block(data: bytes, columns: List[str], dtype: Optional[dict], clean: Optional[Callable]) -> pd.DataFrame:
+    """Parse one block of records (without header) and clean it; runs in a worker process"""
+    df = read_csv_typed(io.BytesIO(data), names=columns, dtype=dtype)
+    return clean(df) if clean is not None else df
+
+
+def iter_parsed_blocks(stream: BinaryIO, columns: List[str], start: int, dtype: Optional[dict] = None,
+                       clean: Optional[Callable] = None, workers: int = 1,
+                       block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, int, pd.DataFrame]]:
+    """Parse and clean record blocks in a process pool, yielding (start, end, df) in file order
+
+    At most two blocks per worker are in flight, so a slow writer applies back-pressure
+    to the reader instead of letting parsed chunks pile up in memory.
+    """
+    blocks = iter_record_blocks(stream, start, block_size)
+    if workers <= 1:
+        for block_start, block_end, data in blocks:
+            yield block_start, block_end, parse_block(data, columns, dtype, clean)
+        return
+
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for block_start, block_end, data in blocks:
+            pending.append((block_start, block_end, pool.submit(parse_block, data, columns, dtype, clean)))
+            if len(pending) >= max_pending:
+                block_start, block_end, future = pending.popleft()
+                yield block_start, block_end, future.result()
+        while pending:
+            block_start, block_end, future = pending.popleft()
+            yield block_start, block_end, future.result()
+
+
+def default_workers() -> int:
+    """Leave one core for the SQLite writer"""
+    return max(1, (os.cpu_count() or 1) - 1)
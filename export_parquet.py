@@ -0,0 +1,194 @@
+import sqlite3
+import logging
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+CSV_PATH = Path(__file__).parent / "cleaned_purchase_history.csv"
+EXPORT_DIR = Path(__file__).parent / "parquet"
+
+CHUNK_SIZE = 200000
+
+# Low-cardinality strings are dictionary encoded so pandas reads them back as categoricals
+TEXT = pa.string()
+DICT_TEXT = pa.dictionary(pa.int32(), pa.string())
+
+PRODUCTS_SCHEMA = pa.schema([
+    ("product_id", pa.int32()),
+    ("title", TEXT),
+    ("description", TEXT),
+    ("price", pa.float32()),
+    ("review_count", pa.int32()),
+    ("avg_rating", pa.float32()),
+    ("category", DICT_TEXT),
+])
+
+REVIEWS_SCHEMA = pa.schema([
+    ("review_id", pa.int64()),
+    ("product_id", pa.int32()),
+    ("user_id", pa.int32()),
+    ("title", DICT_TEXT),
+    ("price", pa.float32()),
+    ("review_summary", TEXT),
+    ("review_rating", pa.dictionary(pa.int8(), pa.float32())),
+    ("review_text", TEXT),
+    ("review_timestamp", pa.timestamp("s")),
+    ("category", DICT_TEXT),
+    ("review_month", DICT_TEXT),
+])
+
+PRODUCTS_PARTITIONS = ["category"]
+REVIEWS_PARTITIONS = ["category", "review_month"]
+
+
+def _partitioning(schema: pa.Schema, partition_by: Sequence[str]) -> ds.Partitioning:
+    """Hive directory partitioning (category=.../review_month=...) on the given columns"""
+    return ds.partitioning(pa.schema([schema.field(name) for name in partition_by]), flavor="hive")
+
+
+def _batches(frames: Iterable[pd.DataFrame], schema: pa.Schema, prepare) -> Iterable[pa.RecordBatch]:
+    """Convert DataFrame chunks into record batches of a fixed schema"""
+    for frame in frames:
+        frame = prepare(frame)[schema.names]
+        for field in schema:
+            if pa.types.is_dictionary(field.type):
+                values = frame[field.name].astype(field.type.value_type.to_pandas_dtype())
+                frame[field.name] = values.astype('category')
+        table = pa.Table.from_pandas(frame, preserve_index=False).cast(schema)
+        yield from table.to_batches()
+
+
+def _prepare_products(frame: pd.DataFrame) -> pd.DataFrame:
+    """Fill in the partition key for products"""
+    frame['category'] = frame['category'].fillna('')
+    return frame
+
+
+def _prepare_reviews(frame: pd.DataFrame) -> pd.DataFrame:
+    """Parse timestamps and derive the review_month partition key"""
+    timestamps = pd.to_datetime(frame['review_timestamp'], errors='coerce', format='mixed')
+    frame['review_timestamp'] = timestamps.dt.floor('s')
+    frame['review_month'] = timestamps.dt.strftime('%Y-%m').fillna('unknown')
+    frame['category'] = frame['category'].fillna('')
+    return frame
+
+
+def _write(batches: Iterable[pa.RecordBatch], schema: pa.Schema, target: Path, partition_by: Sequence[str]) -> None:
+    """Stream batches into a hive-partitioned Parquet dataset"""
+    ds.write_dataset(
+        batches,
+        target,
+        schema=schema,
+        format="parquet",
+        partitioning=_partitioning(schema, partition_by),
+        existing_data_behavior="delete_matching",
+        max_partitions=100000,
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd", use_dictionary=True),
+    )
+
+
+def export_parquet(db_path: Path = DB_PATH, export_dir: Path = EXPORT_DIR, chunk_size: int = CHUNK_SIZE) -> None:
+    """Export products and reviews from the built database to partitioned Parquet datasets"""
+    start_time = time.time()
+    export_dir = Path(export_dir)
+    # write_dataset pulls batches from its own thread, so the cursor must be shareable
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    try:
+        logger.info(f"Exporting products to {export_dir / 'products'} (partitioned by category)...")
+        products = pd.read_sql_query(
+            "SELECT product_id, title, category, description, price, review_count, avg_rating FROM products",
+            conn, chunksize=chunk_size
+        )
+        _write(_batches(products, PRODUCTS_SCHEMA, _prepare_products),
+               PRODUCTS_SCHEMA, export_dir / "products", PRODUCTS_PARTITIONS)
+
+        logger.info(f"Exporting reviews to {export_dir / 'reviews'} (partitioned by category and review month)...")
+        reviews = pd.read_sql_query("""
+            SELECT
+                r.review_id,
+                r.product_id,
+                r.user_id,
+                p.title,
+                p.category,
+                p.price,
+                r.review_summary,
+                r.review_rating,
+                r.review_text,
+                r.review_timestamp
+            FROM reviews r
+            JOIN products p ON p.product_id = r.product_id
+        """, conn, chunksize=chunk_size)
+        _write(_batches(reviews, REVIEWS_SCHEMA, _prepare_reviews),
+               REVIEWS_SCHEMA, export_dir / "reviews", REVIEWS_PARTITIONS)
+    finally:
+        conn.close()
+    logger.info(f"Parquet export completed in {time.time() - start_time:.2f} seconds")
+
+
+def read_reviews(columns: Optional[Sequence[str]] = None, categories: Optional[Sequence[str]] = None,
+                 months: Optional[Sequence[str]] = None, export_dir: Path = EXPORT_DIR) -> pd.DataFrame:
+    """Load only the requested review columns and category/month partitions"""
+    partitioning = ds.partitioning(pa.schema([REVIEWS_SCHEMA.field(name) for name in REVIEWS_PARTITIONS]),
+                                   flavor="hive", dictionaries="infer")
+    dataset = ds.dataset(Path(export_dir) / "reviews", format="parquet", partitioning=partitioning)
+    expression = None
+    if categories:
+        expression = ds.field("category").isin(list(categories))
+    if months:
+        month_filter = ds.field("review_month").isin(list(months))
+        expression = month_filter if expression is None else expression & month_filter
+    table = dataset.to_table(columns=list(columns) if columns else None, filter=expression)
+    return table.to_pandas()
+
+
+def benchmark(csv_path: Path = CSV_PATH, export_dir: Path = EXPORT_DIR,
+              columns: Sequence[str] = ("category", "price", "review_rating")) -> pd.DataFrame:
+    """Compare load time and memory of the CSV path against the Parquet export"""
+    def measure(label, load):
+        start_time = time.perf_counter()
+        df = load()
+        elapsed = time.perf_counter() - start_time
+        return {
+            "load": label,
+            "rows": len(df),
+            "columns": len(df.columns),
+            "seconds": round(elapsed, 3),
+            "memory_mb": round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+        }
+
+    sample = read_reviews(columns=["category", "review_month"], export_dir=export_dir)
+    category = sample["category"].mode().iloc[0] if not sample.empty else None
+    results = [
+        measure("csv, all columns", lambda: pd.read_csv(csv_path)),
+        measure("parquet, all columns", lambda: read_reviews(export_dir=export_dir)),
+        measure(f"parquet, {len(columns)} columns", lambda: read_reviews(columns, export_dir=export_dir)),
+    ]
+    if category is not None:
+        results.append(measure(f"parquet, {len(columns)} columns, category={category}",
+                               lambda: read_reviews(columns, categories=[category], export_dir=export_dir)))
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export amazon_reviews.db to partitioned Parquet")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database to export")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR, help="Directory for the Parquet datasets")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare loading the export with reading cleaned_purchase_history.csv")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="CSV used by --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(benchmark(args.csv, args.out).to_string(index=False))
+    else:
+        export_parquet(args.db, args.out)
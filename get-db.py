@@ -3,6 +3,7 @@ import logging
 from botocore.exceptions import ClientError
 from pathlib import Path
 import configparser
+import json
 import os
 
 # Set up logging
@@ -62,5 +63,51 @@ def download_db():
         logger.error(f"Unexpected error: {str(e)}")
         return False
 
+def download_shards(shard_dir='shards'):
+    """Download the category-sharded layout built by shards.py instead of the single database"""
+    try:
+        creds = get_aws_credentials()
+        if not creds:
+            return False
+
+        s3_client = boto3.client(
+            's3',
+            region_name='us-west-1',
+            aws_access_key_id=creds['aws_access_key_id'],
+            aws_secret_access_key=creds['aws_secret_access_key']
+        )
+        bucket_name = "mgsc410"
+        Path(shard_dir).mkdir(parents=True, exist_ok=True)
+
+        # The manifest lists the shard count and which shard holds each category
+        manifest_path = Path(shard_dir) / 'manifest.json'
+        s3_client.download_file(bucket_name, 'shards/manifest.json', str(manifest_path))
+        shard_count = json.loads(manifest_path.read_text())['shards']
+
+        for shard in range(shard_count):
+            name = f'amazon_reviews_{shard:02d}.db'
+            logger.info(f"Downloading shard {shard + 1}/{shard_count} ({name})...")
+            s3_client.download_file(bucket_name, f'shards/{name}', str(Path(shard_dir) / name))
+
+        logger.info(f"Successfully downloaded {shard_count} shards into {shard_dir}")
+        return True
+
+    except ClientError as e:
+        logger.error(f"Error downloading shards: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return False
+
 if __name__ == "__main__":
-    download_db()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download the amazon reviews database from S3")
+    parser.add_argument("--shards", action="store_true",
+                        help="Download the category-sharded layout (set AMAZON_REVIEWS_SHARD_DIR=shards to serve it)")
+    args = parser.parse_args()
+
+    if args.shards:
+        download_shards()
+    else:
+        download_db()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import logging
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+CSV_PATH = Path(__file__).parent / "cleaned_purchase_history.csv"
+
+# Column types from EDA_Automation_Legend.md: STRING columns stay object, CATEGORICAL
+# columns become categories, FLOAT32/INT32 columns get the narrow numeric types.
+# review_rating is parsed as float32 and made categorical afterwards (see apply_legend)
+# so both CSV engines agree on numeric categories.
+CLEANED_DTYPES = {
+    'title': object,
+    'category': 'category',
+    'description': object,
+    'price': 'float32',
+    'review_summary': object,
+    'review_rating': 'float32',
+    'review_text': object,
+    'review_timestamp': 'Int32',  # Epoch seconds; nullable so missing values survive
+    'user_id': str,
+}
+
+CATEGORICAL_COLUMNS = ['category', 'review_rating']
+
+
+def csv_engine() -> str:
+    """Multithreaded pyarrow CSV reader when installed, pandas' C parser otherwise"""
+    return 'pyarrow' if pa is not None else 'c'
+
+
+def _arrow_type(dtype):
+    """Arrow column type matching a pandas dtype from CLEANED_DTYPES"""
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype in ('float32', 'float64', 'Int32'):
+        return {'float32': pa.float32(), 'float64': pa.float64(), 'Int32': pa.int32()}[dtype]
+    return pa.string()
+
+
+def read_csv_typed(source, names: Optional[Sequence[str]] = None, dtype: Optional[dict] = None,
+                   usecols: Optional[Sequence[str]] = None, engine: Optional[str] = None) -> pd.DataFrame:
+    """pd.read_csv with dtypes, using pyarrow's reader when it is installed
+
+    With `names` the source has no header row (used for CSV blocks). pandas' own
+    pyarrow engine cannot parse quoted values spanning lines, so pyarrow is called
+    directly with newlines_in_values.
+    """
+    dtype = dtype or {}
+    if (engine or csv_engine()) == 'c':
+        return pd.read_csv(source, header=None if names else 'infer', names=names, dtype=dtype,
+                           usecols=list(usecols) if usecols else None)
+
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=list(names) if names else None),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col: _arrow_type(col_dtype) for col, col_dtype in dtype.items()},
+            include_columns=list(usecols) if usecols else None,
+            strings_can_be_null=True,  # Empty fields are missing, as with pandas
+        ),
+    )
+    # self_destruct frees each Arrow column once converted, roughly halving the peak
+    return table.to_pandas(types_mapper={pa.int32(): pd.Int32Dtype()}.get, split_blocks=True, self_destruct=True)
+
+
+def apply_legend(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the legend's CATEGORICAL columns that were parsed as another type"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def review_datetimes(epochs: pd.Series) -> pd.Series:
+    """Turn INT32 epoch-second review timestamps into datetimes"""
+    return pd.to_datetime(epochs, unit='s', errors='coerce')
+
+
+def read_cleaned_csv(path: Path = CSV_PATH, columns: Optional[Sequence[str]] = None,
+                     engine: Optional[str] = None) -> pd.DataFrame:
+    """Read cleaned_purchase_history.csv with the legend's column types
+
+    pyarrow parses about twice as fast but briefly holds the Arrow table next to the
+    DataFrame; engine='c' keeps the lower peak when memory is the constraint.
+    """
+    dtype = {col: CLEANED_DTYPES[col] for col in columns} if columns else CLEANED_DTYPES
+    return apply_legend(read_csv_typed(path, dtype=dtype, usecols=columns, engine=engine))
+
+
+def _measure(path: str, engine: Optional[str], columns: Optional[Sequence[str]]) -> dict:
+    """Load the CSV once and report time and peak memory; runs in a fresh process"""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    if engine is None:
+        df = pd.read_csv(path, usecols=columns)
+    else:
+        df = read_cleaned_csv(path, columns, engine=engine)
+    elapsed = time.perf_counter() - start_time
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "load": f"typed ({engine})" if engine else "untyped (c)",
+        "columns": len(df.columns),
+        "rows": len(df),
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round((peak - baseline) / 1024, 1),  # ru_maxrss is in KB on Linux
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+    }
+
+
+def benchmark(path: Path = CSV_PATH,
+              columns: Sequence[str] = ("category", "price", "review_rating")) -> pd.DataFrame:
+    """Compare parse time and peak memory of untyped and typed loads, all columns and a subset"""
+    engines = [None, 'c'] + (['pyarrow'] if pa is not None else [])
+    results = []
+    for subset in (None, list(columns)):
+        for engine in engines:
+            # A new interpreter per load, so one load's peak does not hide the other's
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results.append(pool.submit(_measure, str(path), engine, subset).result())
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Typed loading of cleaned_purchase_history.csv")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="Cleaned CSV to load")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare parse time and peak memory against an untyped pd.read_csv")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(benchmark(args.csv).to_string(index=False))
+    else:
+        df = read_cleaned_csv(args.csv)
+        df.info(memory_usage='deep')
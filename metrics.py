@@ -0,0 +1,395 @@
+import sqlite3
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # DuckDB is optional, SQLite is always available
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+ENGINES = ("sqlite", "duckdb")
+
+METRIC_COLUMNS = [
+    "product_id", "title", "category", "price", "review_count", "avg_rating",
+    "sentiment_score", "recent_reviews", "avg_category_price",
+    "price_diff_percentage", "sentiment_per_review", "product_score"
+]
+
+PRODUCT_METRICS_DDL = """
+    CREATE TABLE product_metrics_mv (
+        product_id INTEGER PRIMARY KEY,
+        title TEXT,
+        category TEXT,
+        price REAL,
+        review_count INTEGER,
+        avg_rating REAL,
+        sentiment_score INTEGER,
+        recent_reviews INTEGER,
+        avg_category_price REAL,
+        price_diff_percentage REAL,
+        sentiment_per_review REAL,
+        product_score REAL
+    )
+"""
+
+PRODUCT_METRICS_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_mv_title ON product_metrics_mv(title);',
+    'CREATE INDEX IF NOT EXISTS idx_mv_category ON product_metrics_mv(category);',
+    'CREATE INDEX IF NOT EXISTS idx_mv_price ON product_metrics_mv(price);',
+    'CREATE INDEX IF NOT EXISTS idx_mv_product_score ON product_metrics_mv(product_score);',
+    'CREATE INDEX IF NOT EXISTS idx_mv_sentiment_score ON product_metrics_mv(sentiment_per_review);',
+]
+
+# Product metrics for SQLite; :as_of anchors the 30 day "recent reviews" window and
+# {products} lets a refresh restrict the query to some categories
+SQLITE_PRODUCT_METRICS = """
+    WITH product_metrics AS (
+        SELECT
+            p.product_id,
+            p.title,
+            p.category,
+            p.price,
+            COUNT(r.review_id) as review_count,
+            AVG(r.review_rating) as avg_rating,
+            SUM(CASE
+                WHEN r.review_rating >= 4 THEN 2
+                WHEN r.review_rating > 2 THEN 1
+                ELSE -1
+            END) as sentiment_score,
+            SUM(CASE
+                WHEN julianday(:as_of) - julianday(r.review_timestamp) <= 30
+                THEN 1 ELSE 0
+            END) as recent_reviews,
+            AVG(p.price) OVER (PARTITION BY p.category) as avg_category_price,
+            ROUND((p.price - AVG(p.price) OVER (PARTITION BY p.category)) * 100.0 /
+                NULLIF(AVG(p.price) OVER (PARTITION BY p.category), 0), 1) as price_diff_percentage,
+            ROUND(CAST(SUM(CASE
+                WHEN r.review_rating >= 4 THEN 2
+                WHEN r.review_rating > 2 THEN 1
+                ELSE -1
+            END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 2) as sentiment_per_review,
+            ROUND(
+                (COALESCE(AVG(r.review_rating), 0) * 0.3 +
+                COALESCE(CAST(SUM(CASE
+                    WHEN julianday(:as_of) - julianday(r.review_timestamp) <= 30
+                    THEN 1 ELSE 0
+                END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 0) * 0.3 +
+                CASE WHEN p.price < AVG(p.price) OVER (PARTITION BY p.category) THEN 0.2 ELSE -0.2 END +
+                COALESCE(CAST(SUM(CASE
+                    WHEN r.review_rating >= 4 THEN 2
+                    WHEN r.review_rating > 2 THEN 1
+                    ELSE -1
+                END) AS FLOAT) / NULLIF(COUNT(r.review_id), 0), 0) * 0.2) * 100,
+                1
+            ) as product_score
+        FROM {products} p
+        LEFT JOIN reviews r ON p.product_id = r.product_id
+        GROUP BY p.product_id, p.title, p.category, p.price
+    )
+    SELECT * FROM product_metrics
+"""
+
+# Same metrics in DuckDB's dialect: aggregate reviews first, then join products.
+# Scores are left unrounded here and rounded by SQLite, see _round_like_sqlite.
+DUCKDB_PRODUCT_METRICS = """
+    WITH review_agg AS (
+        SELECT
+            product_id,
+            COUNT(review_id) AS review_count,
+            AVG(review_rating) AS avg_rating,
+            SUM(CASE
+                WHEN review_rating >= 4 THEN 2
+                WHEN review_rating > 2 THEN 1
+                ELSE -1
+            END) AS sentiment_score,
+            SUM(CASE
+                WHEN CAST(review_timestamp AS TIMESTAMP) >= CAST($as_of AS TIMESTAMP) - INTERVAL 30 DAY
+                THEN 1 ELSE 0
+            END) AS recent_reviews
+        FROM {reviews}
+        GROUP BY product_id
+    ),
+    product_metrics AS (
+        SELECT
+            p.product_id,
+            p.title,
+            p.category,
+            p.price,
+            COALESCE(a.review_count, 0) AS review_count,
+            a.avg_rating,
+            -- A product without reviews still joins one NULL review row in SQLite
+            COALESCE(a.sentiment_score, -1) AS sentiment_score,
+            COALESCE(a.recent_reviews, 0) AS recent_reviews,
+            AVG(p.price) OVER (PARTITION BY p.category) AS avg_category_price
+        FROM {products} p
+        LEFT JOIN review_agg a ON p.product_id = a.product_id
+    )
+    SELECT
+        product_id,
+        title,
+        category,
+        price,
+        review_count,
+        avg_rating,
+        sentiment_score,
+        recent_reviews,
+        avg_category_price,
+        (price - avg_category_price) * 100.0 / NULLIF(avg_category_price, 0) AS price_diff_percentage,
+        CAST(sentiment_score AS DOUBLE) / NULLIF(review_count, 0) AS sentiment_per_review,
+        (COALESCE(avg_rating, 0) * 0.3 +
+        COALESCE(CAST(recent_reviews AS DOUBLE) / NULLIF(review_count, 0), 0) * 0.3 +
+        CASE WHEN price < avg_category_price THEN 0.2 ELSE -0.2 END +
+        COALESCE(CAST(sentiment_score AS DOUBLE) / NULLIF(review_count, 0), 0) * 0.2) * 100 AS product_score
+    FROM product_metrics
+"""
+
+
+# Columns SQLITE_PRODUCT_METRICS rounds, with their precision
+ROUNDED_COLUMNS = {"price_diff_percentage": 1, "sentiment_per_review": 2, "product_score": 1}
+
+
+def _as_of(as_of: Optional[datetime]) -> str:
+    """Format the reference time the way SQLite stores review timestamps (now in UTC, like julianday('now'))"""
+    return (as_of or datetime.now(timezone.utc)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def duckdb_connect(db_path: Path = DB_PATH):
+    """Open an in-memory DuckDB that exposes the SQLite tables as `src.products` / `src.reviews`"""
+    if duckdb is None:
+        raise RuntimeError("The duckdb engine requires the duckdb package (pip install duckdb)")
+    con = duckdb.connect()
+    try:
+        con.execute("INSTALL sqlite; LOAD sqlite;")
+        con.execute(f"ATTACH '{Path(db_path)}' AS src (TYPE sqlite, READ_ONLY)")
+    except duckdb.Error as e:
+        # Offline hosts cannot fetch the sqlite extension; hand DuckDB the columns it needs instead
+        logger.warning(f"DuckDB sqlite extension unavailable ({e}), loading tables through sqlite3")
+        conn = sqlite3.connect(str(db_path))
+        try:
+            products = pd.read_sql_query("SELECT product_id, title, category, price FROM products", conn)
+            reviews = pd.read_sql_query(
+                "SELECT review_id, product_id, review_rating, review_timestamp FROM reviews", conn
+            )
+        finally:
+            conn.close()
+        con.execute("CREATE SCHEMA src")
+        con.register("products_df", products)
+        con.register("reviews_df", reviews)
+        con.execute("CREATE VIEW src.products AS SELECT * FROM products_df")
+        con.execute("CREATE VIEW src.reviews AS SELECT * FROM reviews_df")
+    return con
+
+
+def _round_like_sqlite(df: pd.DataFrame) -> pd.DataFrame:
+    """Round score columns with SQLite's ROUND so both engines agree to the last digit"""
+    # SQLite's ROUND and DuckDB's disagree on values a few ulps below a half, e.g. 81.24999999999999
+    columns = list(ROUNDED_COLUMNS)
+    values = df[columns].astype(object).where(df[columns].notna(), None)
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute(f"CREATE TABLE scores (row INTEGER PRIMARY KEY, {', '.join(f'{c} REAL' for c in columns)})")
+        conn.executemany(
+            f"INSERT INTO scores VALUES (?, {', '.join('?' for _ in columns)})",
+            ((i, *row) for i, row in enumerate(values.itertuples(index=False, name=None)))
+        )
+        rounded = conn.execute(
+            f"SELECT {', '.join(f'ROUND({c}, {n})' for c, n in ROUNDED_COLUMNS.items())} FROM scores ORDER BY row"
+        ).fetchall()
+    finally:
+        conn.close()
+    df = df.copy()
+    df[columns] = pd.DataFrame(rounded, columns=columns, index=df.index, dtype=float)
+    return df
+
+
+def compute_product_metrics(db_path: Path = DB_PATH, engine: str = "sqlite",
+                            as_of: Optional[datetime] = None) -> pd.DataFrame:
+    """Compute product metrics with the chosen engine and return them as a DataFrame"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown metrics engine {engine!r}, expected one of {ENGINES}")
+
+    if engine == "duckdb":
+        con = duckdb_connect(db_path)
+        try:
+            query = DUCKDB_PRODUCT_METRICS.format(products="src.products", reviews="src.reviews")
+            df = _round_like_sqlite(con.execute(query, {"as_of": _as_of(as_of)}).df())
+        finally:
+            con.close()
+    else:
+        conn = sqlite3.connect(str(db_path))
+        try:
+            df = pd.read_sql_query(SQLITE_PRODUCT_METRICS.format(products="products"), conn,
+                                   params={"as_of": _as_of(as_of)})
+        finally:
+            conn.close()
+
+    return df[METRIC_COLUMNS].sort_values("product_id", ignore_index=True)
+
+
+def write_product_metrics(conn: sqlite3.Connection, df: pd.DataFrame) -> None:
+    """Replace product_metrics_mv in the serving database with precomputed rows"""
+    conn.execute('DROP TABLE IF EXISTS product_metrics_mv')
+    conn.execute(PRODUCT_METRICS_DDL)
+    placeholders = ", ".join("?" for _ in METRIC_COLUMNS)
+    rows = df[METRIC_COLUMNS].astype(object).where(df[METRIC_COLUMNS].notna(), None)
+    conn.executemany(
+        f"INSERT INTO product_metrics_mv ({', '.join(METRIC_COLUMNS)}) VALUES ({placeholders})",
+        rows.itertuples(index=False, name=None)
+    )
+    for statement in PRODUCT_METRICS_INDEXES:
+        conn.execute(statement)
+
+
+def build_product_metrics(conn: sqlite3.Connection, db_path: Path = DB_PATH, engine: str = "sqlite",
+                          as_of: Optional[datetime] = None) -> None:
+    """(Re)build product_metrics_mv, optionally offloading the aggregation to DuckDB"""
+    start_time = time.time()
+    if engine == "duckdb":
+        # DuckDB reads the committed file, so make sure our own writes are visible
+        conn.commit()
+        df = compute_product_metrics(db_path, engine="duckdb", as_of=as_of)
+        write_product_metrics(conn, df)
+    else:
+        conn.execute('DROP TABLE IF EXISTS product_metrics_mv')
+        conn.execute(PRODUCT_METRICS_DDL)
+        conn.execute(f"INSERT INTO product_metrics_mv {SQLITE_PRODUCT_METRICS.format(products='products')}",
+                     {"as_of": _as_of(as_of)})
+        for statement in PRODUCT_METRICS_INDEXES:
+            conn.execute(statement)
+    conn.commit()
+    logger.info(f"Built product_metrics_mv with {engine} in {time.time() - start_time:.2f} seconds")
+
+
+def refresh_product_metrics(conn: sqlite3.Connection, categories, as_of: Optional[datetime] = None) -> None:
+    """Recompute product_metrics_mv rows for the given categories only
+
+    Category averages feed every product's score, so a touched product means
+    recomputing its whole category; other categories keep their last build.
+    """
+    start_time = time.time()
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS refresh_categories (category TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM refresh_categories')
+    conn.executemany('INSERT OR IGNORE INTO refresh_categories VALUES (?)', ((category,) for category in categories))
+    # IFNULL so products without a category, which share one window partition, refresh together
+    selected = "IFNULL(category, '') IN (SELECT IFNULL(category, '') FROM refresh_categories)"
+    products = f"(SELECT * FROM products WHERE {selected})"
+    conn.execute(f'DELETE FROM product_metrics_mv WHERE {selected}')
+    conn.execute(f"INSERT INTO product_metrics_mv {SQLITE_PRODUCT_METRICS.format(products=products)}",
+                 {"as_of": _as_of(as_of)})
+    conn.execute('DROP TABLE refresh_categories')
+    logger.info(f"Refreshed product_metrics_mv for {len(categories):,} categories "
+                f"in {time.time() - start_time:.2f} seconds")
+
+
+def check_parity(db_path: Path = DB_PATH, as_of: Optional[datetime] = None) -> bool:
+    """Compare SQLite and DuckDB product metrics on the same database and log any differences"""
+    as_of = as_of or datetime.now(timezone.utc)
+    timings = {}
+    results = {}
+    for engine in ENGINES:
+        start_time = time.time()
+        results[engine] = compute_product_metrics(db_path, engine=engine, as_of=as_of)
+        timings[engine] = time.time() - start_time
+        logger.info(f"{engine}: {len(results[engine]):,} products in {timings[engine]:.2f} seconds")
+
+    expected, actual = results["sqlite"], results["duckdb"]
+    if not expected["product_id"].equals(actual["product_id"]):
+        logger.error("Parity check failed: engines returned different products")
+        return False
+
+    matches = True
+    for col in METRIC_COLUMNS[1:]:
+        left, right = expected[col], actual[col]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            same = np.isclose(left.astype(float), right.astype(float), rtol=0, atol=1e-9, equal_nan=True)
+        else:
+            same = (left.fillna("") == right.fillna("")).to_numpy()
+        mismatches = int((~same).sum())
+        if mismatches:
+            matches = False
+            logger.error(f"Parity check failed for {col}: {mismatches:,} differing rows")
+
+    if matches:
+        logger.info("Parity check passed: SQLite and DuckDB metrics are identical")
+    return matches
+
+
+def category_averages(db_path: Path = DB_PATH, engine: str = "sqlite") -> pd.DataFrame:
+    """Average price, rating and review volume per category for offline analysis"""
+    query = """
+        SELECT
+            p.category,
+            COUNT(DISTINCT p.product_id) AS products,
+            COUNT(r.review_id) AS reviews,
+            AVG(p.price) AS avg_price,
+            AVG(r.review_rating) AS avg_rating
+        FROM {products} p
+        LEFT JOIN {reviews} r ON p.product_id = r.product_id
+        GROUP BY p.category
+        ORDER BY reviews DESC
+    """
+    return _run_analytics(query, db_path, engine)
+
+
+def monthly_reviews(db_path: Path = DB_PATH, engine: str = "sqlite") -> pd.DataFrame:
+    """Review volume and average rating per category and month"""
+    month = {
+        "sqlite": "strftime('%Y-%m', r.review_timestamp)",
+        "duckdb": "strftime(CAST(r.review_timestamp AS TIMESTAMP), '%Y-%m')",
+    }[engine]
+    query = f"""
+        SELECT
+            p.category,
+            {month} AS review_month,
+            COUNT(*) AS reviews,
+            AVG(r.review_rating) AS avg_rating
+        FROM {{reviews}} r
+        JOIN {{products}} p ON p.product_id = r.product_id
+        GROUP BY p.category, review_month
+        ORDER BY p.category, review_month
+    """
+    return _run_analytics(query, db_path, engine)
+
+
+def _run_analytics(query: str, db_path: Path, engine: str) -> pd.DataFrame:
+    """Run an offline analytics query against the SQLite file with the chosen engine"""
+    if engine == "duckdb":
+        con = duckdb_connect(db_path)
+        try:
+            return con.execute(query.format(products="src.products", reviews="src.reviews")).df()
+        finally:
+            con.close()
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return pd.read_sql_query(query.format(products="products", reviews="reviews"), conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build product metrics or check engine parity")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database to read and update")
+    parser.add_argument("--engine", choices=ENGINES, default="sqlite", help="Engine used for the aggregation")
+    parser.add_argument("--parity", action="store_true", help="Compare SQLite and DuckDB results instead of building")
+    args = parser.parse_args()
+
+    if args.parity:
+        raise SystemExit(0 if check_parity(args.db) else 1)
+
+    conn = sqlite3.connect(str(args.db))
+    try:
+        build_product_metrics(conn, db_path=args.db, engine=args.engine)
+    finally:
+        conn.close()
@@ -0,0 +1,113 @@
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+from loaders import read_cleaned_csv
+
+logger = logging.getLogger(__name__)
+
+CSV_PATH = Path(__file__).parent / "cleaned_purchase_history.csv"
+
+# Zero-width characters, direction marks (U+200E/U+200F), line/paragraph separators and BOM
+INVISIBLE = '[\u200b-\u200f\u2028\u2029\ufeff]'
+# Python's \s; RE2 (used by pyarrow) only knows ASCII whitespace without \v, so spell it out
+WHITESPACE = '[\\t\\n\\x0b\\f\\r \\x1c-\\x1f\\x85\\xa0\\x{1680}\\x{2000}-\\x{200a}\\x{202f}\\x{205f}\\x{3000}]+'
+# Anything but letters, digits and whitespace, as the notebook's isalnum() filter
+NON_TOKEN = '[^\\p{L}\\p{N}\\s]'
+
+INVISIBLE_RE = re.compile(INVISIBLE)
+WHITESPACE_RE = re.compile(r'\s+')
+NON_TOKEN_RE = re.compile(r'[^\w\s]|_')
+
+
+def clean_special_chars(content):
+    """Per-cell cleaning from 2_CleanedDatasetRevised.ipynb, kept as the benchmark baseline"""
+    if not isinstance(content, str):
+        return content
+    content = re.sub(r'[\u200B-\u200F\u2028\u2029\uFEFF]', '', content)
+    content = re.sub(r'[\n\r\f\v]+', ' ', content)
+    content = re.sub(r'\s+', ' ', content)
+    return content.strip()
+
+
+def _arrow_strings(series: pd.Series):
+    return pa.array(series.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+
+
+def _to_series(array, index: pd.Index) -> pd.Series:
+    return pd.Series(array.to_numpy(zero_copy_only=False), index=index, dtype=object)
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """Drop invisible characters, collapse whitespace runs (line breaks included) to one space, and trim
+
+    Runs as whole-column pyarrow kernels when available, otherwise as precompiled
+    pandas string operations. Missing values stay missing.
+    """
+    if pa is not None:
+        array = _arrow_strings(series)
+        array = pc.replace_substring_regex(array, INVISIBLE, '')
+        array = pc.replace_substring_regex(array, WHITESPACE, ' ')
+        return _to_series(pc.utf8_trim(array, ' '), series.index)
+    return (series.str.replace(INVISIBLE_RE, '', regex=True)
+            .str.replace(WHITESPACE_RE, ' ', regex=True)
+            .str.strip())
+
+
+def token_text(series: pd.Series) -> pd.Series:
+    """Normalized, lowercased text with only letters, digits and single spaces, ready to split into tokens"""
+    if pa is not None:
+        array = _arrow_strings(normalize_text(series))
+        array = pc.replace_substring_regex(pc.utf8_lower(array), NON_TOKEN, '')
+        # Removing punctuation can leave double or edge spaces behind
+        array = pc.replace_substring_regex(array, ' +', ' ')
+        return _to_series(pc.utf8_trim(array, ' '), series.index)
+    return (normalize_text(series).str.lower()
+            .str.replace(NON_TOKEN_RE, '', regex=True)
+            .str.replace(' +', ' ', regex=True)
+            .str.strip())
+
+
+def benchmark(path: Path = CSV_PATH, columns: Sequence[str] = ("review_text", "review_summary")) -> pd.DataFrame:
+    """Time the notebook's per-cell .apply against normalize_text on the review text columns"""
+    df = read_cleaned_csv(path, columns=list(columns))
+    results = []
+    for column in columns:
+        start_time = time.perf_counter()
+        expected = df[column].apply(clean_special_chars)
+        apply_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        normalized = normalize_text(df[column])
+        vectorized_seconds = time.perf_counter() - start_time
+
+        results.append({
+            "column": column,
+            "rows": len(df),
+            "apply_seconds": round(apply_seconds, 3),
+            "vectorized_seconds": round(vectorized_seconds, 3),
+            "speedup": round(apply_seconds / vectorized_seconds, 1) if vectorized_seconds else None,
+            "identical": bool(expected.fillna('').equals(normalized.fillna(''))),
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark text normalization on the cleaned CSV")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="Cleaned CSV to read review text from")
+    args = parser.parse_args()
+
+    print(benchmark(args.csv).to_string(index=False))
@@ -0,0 +1,116 @@
+import time
+from typing import Callable, TypeVar
+
+from shiny import reactive
+
+T = TypeVar("T")
+
+
+def debounce(delay_secs: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """Reactive calc that only updates once its source has been quiet for delay_secs
+
+    A burst of changes (typing into a search box) produces a single update with the
+    last value. Must be created inside a session, like any reactive.
+    """
+    def wrapper(f: Callable[[], T]) -> Callable[[], T]:
+        deadline = reactive.Value(None)
+        trigger = reactive.Value(0)
+
+        @reactive.Calc
+        def source():
+            return f()
+
+        primed = False
+
+        @reactive.Effect(priority=102)
+        def _primer():
+            # Every change of the source pushes the deadline back; the initial value is not a change
+            nonlocal primed
+            try:
+                source()
+            except Exception:
+                pass
+            finally:
+                if primed:
+                    deadline.set(time.time() + delay_secs)
+                primed = True
+
+        @reactive.Effect(priority=101)
+        def _timer():
+            when = deadline()
+            if when is None:
+                return
+            remaining = when - time.time()
+            if remaining <= 0:
+                with reactive.isolate():
+                    deadline.set(None)
+                    trigger.set(trigger() + 1)
+            else:
+                reactive.invalidate_later(remaining)
+
+        @reactive.Calc
+        @reactive.event(trigger, ignore_none=False)
+        def debounced() -> T:
+            return source()
+
+        return debounced
+
+    return wrapper
+
+
+def throttle(delay_secs: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """Reactive calc that updates at most once every delay_secs
+
+    The first change goes through at once; changes within the window are held back
+    and the latest one is delivered when the window ends. Must be created inside a
+    session, like any reactive.
+    """
+    def wrapper(f: Callable[[], T]) -> Callable[[], T]:
+        last_signaled = reactive.Value(None)
+        last_fired = reactive.Value(None)
+        trigger = reactive.Value(0)
+
+        @reactive.Calc
+        def source():
+            return f()
+
+        primed = False
+
+        @reactive.Effect(priority=102)
+        def _primer():
+            nonlocal primed
+            try:
+                source()
+            except Exception:
+                pass
+            finally:
+                if primed:
+                    last_signaled.set(time.time())
+                primed = True
+
+        @reactive.Effect(priority=101)
+        def _timer():
+            signaled = last_signaled()
+            if signaled is None:
+                return
+            with reactive.isolate():
+                fired = last_fired()
+            if fired is not None and fired >= signaled:
+                return  # This change has been delivered already
+            now = time.time()
+            remaining = 0 if fired is None else fired + delay_secs - now
+            if remaining <= 0:
+                with reactive.isolate():
+                    last_fired.set(now)
+                    trigger.set(trigger() + 1)
+            else:
+                reactive.invalidate_later(remaining)
+
+        @reactive.Calc
+        @reactive.event(trigger, ignore_none=False)
+        def throttled() -> T:
+            return source()
+
+        return throttled
+
+    return wrapper
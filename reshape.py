@@ -0,0 +1,134 @@
+import logging
+import re
+import time
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from csv_blocks import iter_parsed_blocks, open_source, read_header
+
+logger = logging.getLogger(__name__)
+
+CSV_PATH = Path(__file__).parent / "cleaned_purchase_history.csv"
+
+PREFIX = 'properties.purchase_history.'
+SLOT_COLUMN = re.compile(r'^properties\.purchase_history\.(\d+)\.(item|review)\.')
+
+# Field of one purchase slot -> column of cleaned_purchase_history.csv
+PURCHASE_FIELDS = {
+    'item.title': 'title',
+    'item.category': 'category',
+    'item.description': 'description',
+    'item.price': 'price',
+    'review.summary': 'review_summary',
+    'review.rating': 'review_rating',
+    'review.text': 'review_text',
+    'review.timestamp': 'review_timestamp',
+}
+NUMERIC_FIELDS = ['price', 'review_rating', 'review_timestamp']
+CLEANED_COLUMNS = list(PURCHASE_FIELDS.values()) + ['user_id']
+
+
+def purchase_slots(columns: Sequence[str]) -> List[int]:
+    """Purchase history slot numbers (1-based) present in the wide export's header"""
+    return sorted({int(match.group(1)) for match in map(SLOT_COLUMN.match, columns) if match})
+
+
+def slot_column(slot: int, field: str) -> str:
+    """Wide column name of one field of one purchase slot"""
+    return f'{PREFIX}{slot}.{field}'
+
+
+def _field_matrix(df: pd.DataFrame, slots: Sequence[int], field: str) -> np.ndarray:
+    """rows x slots array of one field; slots without the column are missing"""
+    return df.reindex(columns=[slot_column(slot, field) for slot in slots]).to_numpy(dtype=object)
+
+
+def _filled(matrix: np.ndarray) -> np.ndarray:
+    """Which cells of an object matrix hold a non-blank value"""
+    cells = pd.DataFrame(matrix)
+    return (cells.notna() & (cells.fillna('').astype(str).apply(lambda col: col.str.strip()) != '')).to_numpy()
+
+
+def reshape_block(df: pd.DataFrame, slots: Sequence[int],
+                  clean: Optional[Callable] = None) -> Tuple[pd.DataFrame, int]:
+    """Turn wide rows into one long row per purchase; returns (purchases, wide rows read)
+
+    A row's purchases end at its first empty asin slot (EDA_Automation_Legend.md); exports
+    without asin columns fall back to slots that have a price or a rating. `user_id` is the
+    row's position in this block and is made global by iter_long_blocks.
+    """
+    asin_columns = [slot_column(slot, 'item.asin') for slot in slots]
+    if any(col in df.columns for col in asin_columns):
+        present = _filled(_field_matrix(df, slots, 'item.asin'))
+        # Once a slot is empty the history has ended, even if later slots hold data
+        present = np.logical_and.accumulate(present, axis=1)
+    else:
+        present = (pd.notna(_field_matrix(df, slots, 'item.price'))
+                   | pd.notna(_field_matrix(df, slots, 'review.rating')))
+
+    rows, slot_index = np.nonzero(present)
+    long = pd.DataFrame({
+        column: _field_matrix(df, slots, field)[rows, slot_index]
+        for field, column in PURCHASE_FIELDS.items()
+    })
+    for column in NUMERIC_FIELDS:
+        long[column] = pd.to_numeric(long[column], errors='coerce')
+    long['review_timestamp'] = long['review_timestamp'].astype('Int32')
+    long['user_id'] = rows
+    return (clean(long) if clean is not None else long), len(df)
+
+
+def iter_long_blocks(stream: BinaryIO, clean: Optional[Callable] = None, workers: int = 1,
+                     start: Optional[int] = None) -> Iterator[Tuple[int, int, pd.DataFrame]]:
+    """Stream a wide purchase_history export as (start, end, purchases) record blocks
+
+    Blocks are parsed, reshaped and cleaned in worker processes, so only a few blocks
+    of the export are in memory at once. user_id is the wide row's index in the
+    export, matching create_cleaned_dataframe in 2_CleanedDatasetRevised.ipynb.
+    """
+    columns = read_header(stream)
+    slots = purchase_slots(columns)
+    if not slots:
+        raise ValueError(f"No {PREFIX}N.* columns found; not a wide purchase history export")
+    if start is not None and start != stream.tell():
+        # Row numbers are only known when reading from the first record
+        raise ValueError("Wide exports can only be read from the beginning")
+
+    logger.info(f"Reshaping {len(slots)} purchase slots per row")
+    rows_seen = 0
+    blocks = iter_parsed_blocks(stream, columns, start=stream.tell(), dtype={col: str for col in columns},
+                                clean=partial(reshape_block, slots=slots, clean=clean), workers=workers)
+    for block_start, block_end, (purchases, row_count) in blocks:
+        purchases['user_id'] = (purchases['user_id'] + rows_seen).astype(str)
+        rows_seen += row_count
+        yield block_start, block_end, purchases
+
+
+def write_cleaned_csv(raw_path: Path, out_path: Path = CSV_PATH, workers: int = 1) -> None:
+    """Convert a wide export into cleaned_purchase_history.csv without loading it whole"""
+    start_time = time.time()
+    rows = 0
+    with open_source(raw_path) as raw, open(out_path, 'w', newline='', encoding='utf-8') as out:
+        for i, (_, _, purchases) in enumerate(iter_long_blocks(raw, workers=workers)):
+            purchases.to_csv(out, index=False, header=(i == 0), columns=CLEANED_COLUMNS)
+            rows += len(purchases)
+    logger.info(f"Wrote {rows:,} purchases to {out_path} in {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from csv_blocks import default_workers
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Reshape a wide purchase_history export into one row per purchase")
+    parser.add_argument("raw", type=Path, help="Flattened export with properties.purchase_history.N.* columns")
+    parser.add_argument("--out", type=Path, default=CSV_PATH, help="Cleaned CSV to write")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Parser processes")
+    args = parser.parse_args()
+
+    write_cleaned_csv(args.raw, args.out, workers=args.workers)
@@ -0,0 +1,195 @@
+import sqlite3
+import json
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from metrics import build_product_metrics
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+SHARD_DIR = Path(__file__).parent / "shards"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_SHARDS = 8
+
+
+def shard_for_category(category: Optional[str], shard_count: int) -> int:
+    """Stable shard number for a category (crc32, so it never changes between processes)"""
+    return zlib.crc32((category or '').encode('utf-8')) % shard_count
+
+
+def shard_path(shard_dir: Path, shard: int) -> Path:
+    """File name of one shard"""
+    return Path(shard_dir) / f"amazon_reviews_{shard:02d}.db"
+
+
+def _build_shard(db_path: str, shard_dir: str, shard: int, shard_count: int) -> Dict[str, int]:
+    """Copy one shard's products, their reviews and the reviewing users out of the monolithic database"""
+    start_time = time.time()
+    target = shard_path(Path(shard_dir), shard)
+    building = target.with_suffix('.db.building')
+    if building.exists():
+        building.unlink()
+
+    conn = sqlite3.connect(str(building), isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.create_function('shard_of', 1, lambda category: shard_for_category(category, shard_count),
+                             deterministic=True)
+        conn.execute('ATTACH DATABASE ? AS src', (db_path,))
+        conn.execute('BEGIN')
+        conn.execute('CREATE TABLE products AS SELECT * FROM src.products WHERE 0')
+        conn.execute('CREATE TABLE reviews AS SELECT * FROM src.reviews WHERE 0')
+        conn.execute('CREATE TABLE users AS SELECT * FROM src.users WHERE 0')
+        conn.execute('INSERT INTO products SELECT * FROM src.products WHERE shard_of(category) = ?', (shard,))
+        conn.execute('''
+            INSERT INTO reviews
+            SELECT r.* FROM src.reviews r
+            JOIN products p ON p.product_id = r.product_id
+        ''')
+        conn.execute('''
+            INSERT INTO users
+            SELECT * FROM src.users
+            WHERE user_id IN (SELECT user_id FROM reviews)
+        ''')
+        categories = [row[0] for row in conn.execute('SELECT DISTINCT category FROM products')]
+        conn.execute('COMMIT')
+        conn.execute('DETACH DATABASE src')
+
+        conn.execute('CREATE UNIQUE INDEX idx_product_id ON products(product_id)')
+        conn.execute('CREATE UNIQUE INDEX idx_user_id ON users(user_id)')
+        conn.execute('CREATE INDEX idx_review_product ON reviews(product_id)')
+        conn.execute('CREATE INDEX idx_review_user ON reviews(user_id)')
+        conn.execute('CREATE INDEX idx_review_rating ON reviews(review_rating)')
+        build_product_metrics(conn, db_path=building)
+        conn.execute('ANALYZE')
+        counts = {
+            'products': conn.execute('SELECT COUNT(*) FROM products').fetchone()[0],
+            'reviews': conn.execute('SELECT COUNT(*) FROM reviews').fetchone()[0],
+            'users': conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+    os.replace(building, target)
+    logger.info(f"Built shard {shard} ({counts['products']:,} products, {counts['reviews']:,} reviews, "
+                f"{counts['users']:,} users) "
+                f"in {time.time() - start_time:.2f} seconds")
+    return {'shard': shard, 'categories': categories, **counts}
+
+
+def build_shards(db_path: Path = DB_PATH, shard_dir: Path = SHARD_DIR, shard_count: int = DEFAULT_SHARDS,
+                 only: Optional[Sequence[int]] = None, workers: Optional[int] = None) -> None:
+    """Split the monolithic database into category-hashed shard files, rebuilding shards in parallel"""
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = shard_dir / MANIFEST_FILE
+    manifest = {'shards': shard_count, 'categories': {}}
+    if only:
+        if not manifest_path.exists():
+            # A manifest of only these shards would route every other category nowhere
+            raise ValueError(f"No {MANIFEST_FILE} in {shard_dir}; build all shards before rebuilding some with --only")
+        manifest = json.loads(manifest_path.read_text())
+        if manifest['shards'] != shard_count:
+            raise ValueError(f"Existing layout has {manifest['shards']} shards, cannot rebuild with {shard_count}")
+
+    shards = list(only) if only else list(range(shard_count))
+    with ProcessPoolExecutor(max_workers=workers or min(len(shards), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(_build_shard, [str(db_path)] * len(shards), [str(shard_dir)] * len(shards),
+                                shards, [shard_count] * len(shards)))
+
+    for result in results:
+        manifest['categories'] = {
+            category: shard for category, shard in manifest['categories'].items() if shard != result['shard']
+        }
+        manifest['categories'].update((category, result['shard']) for category in result['categories'])
+
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    logger.info(f"Wrote {manifest_path} for {shard_count} shards")
+
+
+class ShardLayout:
+    """Read side of a sharded layout: routes queries to shards and merges their results"""
+
+    def __init__(self, shard_dir: Path = SHARD_DIR):
+        self.shard_dir = Path(shard_dir)
+        manifest = json.loads((self.shard_dir / MANIFEST_FILE).read_text())
+        self.shard_count: int = manifest['shards']
+        self.categories: Dict[str, int] = manifest['categories']
+        self._executor = ThreadPoolExecutor(max_workers=self.shard_count)
+
+    @classmethod
+    def load(cls, shard_dir: Optional[Path]) -> Optional['ShardLayout']:
+        """Open a layout if the directory has a manifest, otherwise fall back to the single database"""
+        if shard_dir and (Path(shard_dir) / MANIFEST_FILE).exists():
+            return cls(shard_dir)
+        return None
+
+    def shards_for_categories(self, categories: Optional[Sequence[str]]) -> List[int]:
+        """Shards holding any category that a `category LIKE %term%` filter can match"""
+        if not categories:
+            return list(range(self.shard_count))
+        terms = [term.lower() for term in categories]
+        return sorted({
+            shard for category, shard in self.categories.items()
+            if any(term in (category or '').lower() for term in terms)
+        })
+
+    def _query_shard(self, shard: int, query: str, params: Optional[tuple]) -> pd.DataFrame:
+        conn = sqlite3.connect(f"file:{shard_path(self.shard_dir, shard)}?mode=ro", uri=True)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    def query_all(self, query: str, params: Optional[tuple] = None,
+                  shards: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """Run a row-level query on every (or the given) shard in parallel and concatenate the results"""
+        shards = list(range(self.shard_count)) if shards is None else list(shards)
+        if not shards:
+            # Nothing can match, but keep the result's columns
+            return self._query_shard(0, f"SELECT * FROM ({query}) LIMIT 0", params)
+        frames = list(self._executor.map(lambda shard: self._query_shard(shard, query, params), shards))
+        non_empty = [frame for frame in frames if not frame.empty]
+        if not non_empty:
+            return frames[0]
+        return pd.concat(non_empty, ignore_index=True)
+
+    def query_top_n(self, query: str, params: Optional[tuple], order_by: Optional[str], sort_key: Optional[str],
+                    descending: bool, limit: int, offset: int,
+                    shards: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """Page through a sorted query: each shard returns its top offset+limit rows, then merge
+
+        `order_by` is the SQL sort column inside a shard and `sort_key` the matching result column.
+        """
+        if order_by:
+            query = f"{query} ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        df = self.query_all(f"{query} LIMIT {int(offset) + int(limit)}", params, shards)
+        if order_by and sort_key:
+            # SQLite puts NULLs first when ascending and last when descending
+            df = df.sort_values(sort_key, ascending=not descending, kind='mergesort',
+                                na_position='last' if descending else 'first')
+        return df.iloc[offset:offset + limit].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Shard amazon_reviews.db into category-hashed files")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Monolithic database to split")
+    parser.add_argument("--out", type=Path, default=SHARD_DIR, help="Directory for the shard files")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="Number of shards")
+    parser.add_argument("--only", type=int, nargs="+", help="Rebuild only these shard numbers")
+    parser.add_argument("--workers", type=int, help="Parallel shard builders (default: one per shard)")
+    args = parser.parse_args()
+
+    build_shards(args.db, args.out, args.shards, only=args.only, workers=args.workers)
@@ -0,0 +1,175 @@
+import logging
+import random
+import re
+import sqlite3
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+
+MAX_SUGGESTIONS = 20
+PRECOMPUTED_PREFIX = 2  # Prefixes up to this length match many keys, so their top entries are stored
+MAX_WORD_STARTS = 8  # A title can be completed from its first few words, not only its first
+KEY_END = '\U0010ffff'  # Sorts after any character a key can continue with
+PUNCTUATION = re.compile(r'[^\w\s]|_')
+
+# Completion candidates: titles and categories, weighted by product_score
+SUGGEST_QUERY = """
+    SELECT
+        title,
+        category,
+        COALESCE(product_score, 0) as product_score
+    FROM product_metrics_mv
+"""
+
+
+def search_key(text: str) -> str:
+    """Lowercased text without punctuation and with single spaces, as keys and prefixes are compared"""
+    return ' '.join(PUNCTUATION.sub('', text.lower()).split())
+
+
+def _word_starts(key: str) -> List[str]:
+    """key and its suffixes starting at each later word, so "running shoes" also matches "sho" """
+    words = key.split()
+    return [' '.join(words[i:]) for i in range(min(len(words), MAX_WORD_STARTS))]
+
+
+class PrefixIndex:
+    """Top-k weighted prefix completions over a sorted key array searched with bisect
+
+    A prefix matches a contiguous range of the sorted keys; the range's best entries
+    come from numpy's argpartition over the weights, or from a table built up front
+    for the short prefixes whose ranges are large.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, float]]):
+        best: Dict[Tuple[str, str, str], float] = {}
+        for text, kind, weight in entries:
+            if not isinstance(text, str) or not text.strip():
+                continue
+            text = ' '.join(text.split())
+            for key in _word_starts(search_key(text)):
+                entry = (key, text, kind)
+                if weight > best.get(entry, float('-inf')):
+                    best[entry] = weight
+
+        ordered = sorted(best)
+        self._keys = [key for key, _, _ in ordered]
+        self._texts = [text for _, text, _ in ordered]
+        self._kinds = [kind for _, _, kind in ordered]
+        self._weights = np.array([best[entry] for entry in ordered], dtype=np.float64)
+
+        self._top: Dict[str, np.ndarray] = {}
+        for length in range(1, PRECOMPUTED_PREFIX + 1):
+            for prefix in {key[:length] for key in self._keys if len(key) >= length}:
+                self._top[prefix] = self._best_in_range(*self._range(prefix), MAX_SUGGESTIONS * 2)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self._keys, prefix), bisect_left(self._keys, prefix + KEY_END)
+
+    def _best_in_range(self, lo: int, hi: int, count: int) -> np.ndarray:
+        """Positions of the count highest weights in keys[lo:hi], best first"""
+        weights = self._weights[lo:hi]
+        if len(weights) > count:
+            candidates = np.argpartition(-weights, count)[:count]
+        else:
+            candidates = np.arange(len(weights))
+        return lo + candidates[np.argsort(-weights[candidates], kind='stable')]
+
+    def suggest(self, prefix: str, k: int = 10) -> List[dict]:
+        """Up to k distinct completions of prefix, highest product_score first"""
+        prefix = search_key(prefix)
+        k = max(1, min(k, MAX_SUGGESTIONS))
+        if not prefix:
+            return []
+        positions = self._top.get(prefix) if len(prefix) <= PRECOMPUTED_PREFIX else None
+        if positions is None:
+            lo, hi = self._range(prefix)
+            if lo >= hi:
+                return []
+            # Fetch extra, as one title can match through several of its words
+            positions = self._best_in_range(lo, hi, k * 2)
+
+        suggestions = []
+        seen = set()
+        for position in positions:
+            completion = (self._texts[position], self._kinds[position])
+            if completion in seen:
+                continue
+            seen.add(completion)
+            suggestions.append({
+                "text": completion[0],
+                "kind": completion[1],
+                "score": round(float(self._weights[position]), 2),
+            })
+            if len(suggestions) == k:
+                break
+        return suggestions
+
+
+def suggestion_entries(products: pd.DataFrame) -> List[Tuple[str, str, float]]:
+    """(text, kind, weight) for every title, and for every category weighted by its best product"""
+    scores = products['product_score'].fillna(0).astype(float)
+    entries = list(zip(products['title'], ['title'] * len(products), scores))
+    categories = scores.groupby(products['category']).max()
+    entries.extend(zip(categories.index, ['category'] * len(categories), categories.to_numpy()))
+    return entries
+
+
+def build_index(products: pd.DataFrame) -> PrefixIndex:
+    """PrefixIndex over the titles and categories of product_metrics_mv rows"""
+    start_time = time.time()
+    index = PrefixIndex(suggestion_entries(products))
+    logger.info(f"Built suggestion index of {len(index):,} keys in {time.time() - start_time:.2f} seconds")
+    return index
+
+
+def benchmark(db_path: Path = DB_PATH, samples: int = 2000, k: int = 10) -> pd.DataFrame:
+    """Build time and per-lookup latency for random title prefixes of 1 to 12 characters"""
+    with sqlite3.connect(str(db_path)) as conn:
+        products = pd.read_sql_query(SUGGEST_QUERY, conn)
+    start_time = time.perf_counter()
+    index = build_index(products)
+    build_seconds = time.perf_counter() - start_time
+
+    rng = random.Random(0)
+    titles = products['title'].dropna().tolist()
+    results = []
+    for length in (1, 2, 3, 5, 8, 12):
+        prefixes = [rng.choice(titles)[:length] for _ in range(samples)]
+        latencies = []
+        for prefix in prefixes:
+            lookup_start = time.perf_counter()
+            index.suggest(prefix, k)
+            latencies.append(time.perf_counter() - lookup_start)
+        latencies = np.array(latencies) * 1000
+        results.append({
+            "prefix_length": length,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+            "max_ms": round(float(latencies.max()), 4),
+        })
+    logger.info(f"{len(products):,} products, {len(index):,} keys, built in {build_seconds:.2f} seconds")
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark prefix autocomplete over product titles and categories")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Database to read product_metrics_mv from")
+    parser.add_argument("--samples", type=int, default=2000, help="Lookups per prefix length")
+    args = parser.parse_args()
+
+    print(benchmark(args.db, args.samples).to_string(index=False))
@@ -0,0 +1,153 @@
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from shiny import ui
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent / "amazon_reviews.db"
+
+# Columns of the products table, in display order
+TABLE_COLUMNS = [
+    "Product Title",
+    "Category",
+    "Price",
+    "Rating",
+    "Reviews",
+    "Price vs Category Avg %",
+    "Sentiment Score",
+    "Product Score",
+]
+
+HEADER_STYLE = "cursor: pointer; position: relative; padding-right: 20px;"
+INDICATOR_STYLE = "position: absolute; right: 5px; top: 50%; transform: translateY(-50%);"
+
+# Same columns as get_filtered_products_internal in app.py, for the benchmark
+BENCHMARK_QUERY = """
+    SELECT
+        product_id,
+        title as "Product Title",
+        category as "Category",
+        price as "Price",
+        ROUND(avg_rating, 1) as "Rating",
+        review_count as "Reviews",
+        price_diff_percentage as "Price vs Category Avg %",
+        sentiment_per_review as "Sentiment Score",
+        product_score as "Product Score"
+    FROM product_metrics_mv
+    ORDER BY product_score DESC
+    LIMIT ?
+"""
+
+
+def table_header(sort_column: str, sort_direction: str) -> ui.Tag:
+    """Header row with the sort indicator on the active column"""
+    arrow = "↑" if sort_direction == "asc" else "↓"
+    cells = []
+    for column in TABLE_COLUMNS:
+        active = column == sort_column
+        cells.append(ui.tags.th(
+            {
+                "class": f"sortable {sort_direction if active else ''}",
+                "data-column": column,
+                "style": HEADER_STYLE,
+                "role": "button",
+                "tabindex": "0",
+            },
+            column,
+            ui.tags.span(
+                {
+                    "class": f"sort-indicator {'active' if active else ''}",
+                    "style": INDICATOR_STYLE + (f' content: "{arrow}"' if active else ''),
+                },
+                arrow if active else "",
+            ),
+        ))
+    return ui.tags.thead(ui.tags.tr(cells))
+
+
+def _cell_text(values: pd.Series) -> np.ndarray:
+    """str() of every value, HTML-escaped as element text; missing values render empty"""
+    text = values.astype(str).where(values.notna(), '')
+    if values.dtype == object:
+        # Numbers never need escaping, so only text columns pay for it
+        text = (text.str.replace('&', '&amp;', regex=False)
+                .str.replace('<', '&lt;', regex=False)
+                .str.replace('>', '&gt;', regex=False))
+    return text.to_numpy(dtype=object)
+
+
+def table_body(df: pd.DataFrame) -> ui.HTML:
+    """The rows of the products table as one HTML block, built a column at a time
+
+    Each column is formatted and escaped with whole-column string operations, and the
+    cells are concatenated as object arrays, so no tag object is created per row.
+    """
+    ids = df["product_id"].astype(str).to_numpy(dtype=object)
+    rows = '<tr class="product-row" onclick="showReviews(&apos;' + ids + '&apos;)" role="button" tabindex="0">'
+    for column in TABLE_COLUMNS:
+        rows = rows + '<td>' + _cell_text(df[column]) + '</td>'
+    return ui.HTML('<tbody>' + ''.join(rows + '</tr>') + '</tbody>')
+
+
+def table_body_tags(df: pd.DataFrame) -> ui.Tag:
+    """Row-by-row tag tree the products table used to build, kept as the benchmark baseline"""
+    rows = []
+    for _, row in df.iterrows():
+        rows.append(
+            ui.tags.tr(
+                {
+                    "class": "product-row",
+                    "onclick": f"showReviews('{row['product_id']}')",
+                    "role": "button",
+                    "tabindex": "0"
+                },
+                [ui.tags.td(row[column]) for column in TABLE_COLUMNS]
+            )
+        )
+    return ui.tags.tbody(rows)
+
+
+def benchmark(db_path: Path = DB_PATH, sizes: Sequence[int] = (25, 500, 2000), repeat: int = 5) -> pd.DataFrame:
+    """Time rendering the table body to HTML with the tag tree and with table_body"""
+    with sqlite3.connect(str(db_path)) as conn:
+        products = pd.read_sql_query(BENCHMARK_QUERY, conn, params=(max(sizes),))
+    if products.empty:
+        raise ValueError(f"No products in {db_path}; build it with create_db.py first")
+
+    results = []
+    for size in sizes:
+        # Repeat rows when the database holds fewer products than the page size
+        df = products.iloc[np.resize(np.arange(len(products)), size)].reset_index(drop=True)
+        timings = {}
+        for name, render_body in (("tags", table_body_tags), ("vectorized", table_body)):
+            best = float("inf")
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                html = str(render_body(df))
+                best = min(best, time.perf_counter() - start_time)
+            timings[name] = best
+        results.append({
+            "rows": size,
+            "tags_ms": round(timings["tags"] * 1000, 2),
+            "vectorized_ms": round(timings["vectorized"] * 1000, 2),
+            "speedup": round(timings["tags"] / timings["vectorized"], 1) if timings["vectorized"] else None,
+            "html_kb": round(len(html) / 1024, 1),
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark products table rendering")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Database to read products from")
+    args = parser.parse_args()
+
+    print(benchmark(args.db).to_string(index=False))
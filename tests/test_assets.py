@@ -0,0 +1,67 @@
+import shutil
+import subprocess
+
+import pytest
+
+import assets
+
+
+def test_minify_css_keeps_strings_and_urls():
+    source = '''
+    /* comment */
+    .a::before { content: "x ; }  /* y */"; }
+    .b { background: url(img/a;}.png) ; color: red ; }
+    .c { font-family: 'Open  Sans' , serif; }
+    '''
+    assert assets.minify_css(source) == (
+        '.a::before{content:"x ; }  /* y */"}'
+        '.b{background:url(img/a;}.png);color:red}'
+        ".c{font-family:'Open  Sans',serif}"
+    )
+
+
+def test_minify_js_keeps_strings_templates_and_regexes():
+    source = '''
+    // comment
+    const url = "http://example.com/a  b";  /* block */
+    const path = `/${url}  /`;
+    const ratio = 10 / 2 / 5;
+    const slashes = /\\/\\/ not a comment [/*]/g;
+    function clean(s) {
+        return /a  b/.test(s) ? s.replace(/\\s+/g, ' ') : (ratio) / 2;
+    }
+    '''
+    assert assets.minify_js(source).split("\n") == [
+        'const url = "http://example.com/a  b";',
+        'const path = `/${url}  /`;',
+        'const ratio = 10 / 2 / 5;',
+        'const slashes = /\\/\\/ not a comment [/*]/g;',
+        'function clean(s) {',
+        "return /a  b/.test(s) ? s.replace(/\\s+/g, ' ') : (ratio) / 2;",
+        '}',
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_bundles_run_like_their_sources(tmp_path):
+    source = '''
+    const a = 10 / 2 / 5;  // division
+    const re = /\\/\\/ x [/*] {2}/g;
+    function f(s) { return /a  b/.test(s) ? s.replace(/\\s+/g, ' ') : (a) / 2; }
+    console.log(a, re.source, f('a  b'), f('x'), `/${a}/`, [4][0] / 2);
+    '''
+    minified = tmp_path / "minified.js"
+    minified.write_text(assets.minify_js(source))
+    run = lambda *args: subprocess.run(["node", *args], capture_output=True, text=True, check=True).stdout
+    assert run(str(minified)) == run("-e", source)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_build_fails_on_invalid_script(tmp_path):
+    for name in assets.BUNDLES["app.js"]:
+        (tmp_path / name).write_text("const x = (1;\n")
+    (tmp_path / "styles.css").write_text("body { color: red; }\n")
+
+    with pytest.raises(ValueError):
+        assets.build_assets(tmp_path)
+    assert not list((tmp_path / assets.DIST_DIR).glob("app.*.js"))
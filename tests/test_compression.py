@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+import os
+import re
+
+import pytest
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+import compression
+
+BODY = ('{"products": [' + ', '.join(f'{{"id": {n}, "title": "Product {n}"}}' for n in range(200)) + ']}').encode()
+
+
+def call(app, path="/", accept_encoding=None):
+    """Run one GET through an ASGI app; returns (status, headers, body) of the response"""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"",
+             "headers": headers}
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # The client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    response_headers = {}
+    for name, value in start["headers"]:
+        response_headers.setdefault(name.decode().lower(), []).append(value.decode())
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], {name: ", ".join(values) for name, values in response_headers.items()}, body
+
+
+def decode(body, encoding):
+    if encoding == "br":
+        return compression.brotli.decompress(body)
+    return gzip.decompress(body) if encoding == "gzip" else body
+
+
+@pytest.mark.parametrize("accept_encoding,encoding", [
+    ("gzip, deflate", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    (None, None),
+])
+def test_negotiates_encoding(accept_encoding, encoding):
+    if encoding == "br" and compression.brotli is None:
+        pytest.skip("brotli is not installed")
+    app = compression.CompressionMiddleware(Response(BODY, media_type="application/json"))
+
+    status, headers, body = call(app, accept_encoding=accept_encoding)
+
+    assert status == 200
+    assert headers.get("content-encoding") == encoding
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body)
+    assert decode(body, encoding) == BODY
+
+
+def test_streamed_response_is_compressed_as_it_goes():
+    chunks = [BODY[i:i + 500] for i in range(0, len(BODY), 500)]
+    app = compression.CompressionMiddleware(StreamingResponse(iter(chunks), media_type="text/html"))
+
+    _, headers, body = call(app, accept_encoding="gzip")
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.parametrize("response,vary", [
+    (PlainTextResponse("short"), "Accept-Encoding"),
+    (Response(BODY, media_type="image/png"), None),
+    (Response(BODY, media_type="text/css", headers={"Content-Encoding": "br"}), None),
+])
+def test_passes_through_small_binary_and_encoded_responses(response, vary):
+    _, headers, body = call(compression.CompressionMiddleware(response), accept_encoding="gzip")
+
+    assert headers.get("content-encoding") in (None, "br")
+    assert body == response.body
+    assert headers.get("vary") == vary
+
+
+@pytest.mark.parametrize("existing,expected", [
+    ("Accept-Encoding", "Accept-Encoding"),
+    ("accept-encoding, Cookie", "accept-encoding, Cookie"),
+    ("Cookie", "Cookie, Accept-Encoding"),
+])
+def test_vary_names_accept_encoding_once(existing, expected):
+    app = compression.CompressionMiddleware(Response(BODY, media_type="text/html", headers={"Vary": existing}))
+
+    _, headers, _ = call(app, accept_encoding="gzip")
+
+    assert headers["vary"] == expected
+
+
+def test_precompressed_variants_are_served_while_fresh(tmp_path):
+    (tmp_path / "app.css").write_bytes(BODY)
+    (tmp_path / "app.css.gz").write_bytes(gzip.compress(BODY))
+    (tmp_path / "app.0123456789ab.js").write_text("console.log(1);\n")
+    app = compression.PrecompressedStatic(PlainTextResponse("fallback"), tmp_path,
+                                          immutable=re.compile(r"\.[0-9a-f]{12}\.[a-z]+$"))
+
+    _, headers, body = call(app, "/app.css", accept_encoding="gzip, br")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["cache-control"] == compression.STATIC_CACHE_CONTROL
+    assert gzip.decompress(body) == BODY
+
+    _, headers, body = call(app, "/app.css")
+    assert "content-encoding" not in headers and body == BODY
+
+    # An edited file is not answered from its older variant
+    stale = (tmp_path / "app.css.gz").stat().st_mtime - 10
+    os.utime(tmp_path / "app.css.gz", (stale, stale))
+    _, headers, body = call(app, "/app.css", accept_encoding="gzip")
+    assert "content-encoding" not in headers and body == BODY
+
+    _, headers, _ = call(app, "/app.0123456789ab.js", accept_encoding="gzip")
+    assert headers["cache-control"] == compression.IMMUTABLE_CACHE_CONTROL
+
+    assert call(app, "/missing.js")[2] == b"fallback"
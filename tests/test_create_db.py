@@ -0,0 +1,227 @@
+import gzip
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import create_db
+import csv_blocks
+
+SLOTS = 2
+PRODUCTS = 40
+
+
+class Interrupted(Exception):
+    """Stands in for the process being killed between two chunks"""
+
+
+def cleaned_export(first_row, rows):
+    """Cleaned purchase rows first_row.. spread over PRODUCTS products in three categories
+
+    Rows 300-339 review products of their own, so only the start of an append touches them.
+    """
+    numbers = range(first_row, first_row + rows)
+    products = [('Early', n % 4) if 300 <= n < 340 else ('Product', n % PRODUCTS) for n in numbers]
+    return pd.DataFrame({
+        'title': [f'{name} {number}' for name, number in products],
+        'category': [['Books', 'Toys', 'Garden'][number % 3] for _, number in products],
+        'description': 'desc',
+        'price': [5.0 + number for _, number in products],
+        'review_summary': 'ok',
+        'review_rating': [float(1 + n % 5) for n in numbers],
+        'review_text': [f'review {n}' for n in numbers],
+        'review_timestamp': [1_600_000_000 + n * 60 for n in numbers],
+        'user_id': [n % 97 for n in numbers],
+    })
+
+
+def small_blocks(monkeypatch, fail_after=None):
+    """Ingest in 4 KB blocks; with fail_after, stop like a crash once that many blocks are committed"""
+    def blocks(*args, **kwargs):
+        for i, block in enumerate(csv_blocks.iter_parsed_blocks(*args, block_size=4096, **kwargs)):
+            if i == fail_after:
+                raise Interrupted()
+            yield block
+    monkeypatch.setattr(create_db, 'iter_parsed_blocks', blocks)
+
+
+def read_table(db_dir, query):
+    with sqlite3.connect(str(db_dir / 'amazon_reviews.db')) as conn:
+        return pd.read_sql_query(query, conn)
+
+
+def wide_export(first_user, users):
+    """Wide purchase_history rows for users first_user.. with one or two purchases each"""
+    rows = []
+    for user in range(first_user, first_user + users):
+        row = {'properties.name': f'user {user}'}
+        for slot in range(1, SLOTS + 1):
+            prefix = f'properties.purchase_history.{slot}.'
+            filled = slot == 1 or user % 2 == 0
+            row.update({
+                prefix + 'item.asin': f'B{user:04d}{slot}' if filled else None,
+                prefix + 'item.title': f'Product {user % 7}' if filled else None,
+                prefix + 'item.category': ['Books', 'Toys'][user % 2] if filled else None,
+                prefix + 'item.description': 'desc' if filled else None,
+                prefix + 'item.price': 9.99 + user % 7 if filled else None,
+                prefix + 'review.summary': 'ok' if filled else None,
+                prefix + 'review.rating': float(1 + user % 5) if filled else None,
+                prefix + 'review.text': f'review {user}/{slot}' if filled else None,
+                prefix + 'review.timestamp': 1_600_000_000 + user * 1000 + slot if filled else None,
+            })
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def build(tmp_path, monkeypatch, **kwargs):
+    """Run create_db with amazon_reviews.db placed in tmp_path; returns the reviews it holds"""
+    monkeypatch.setattr(create_db, '__file__', str(tmp_path / 'create_db.py'))
+    create_db.create_db(**kwargs)
+    with sqlite3.connect(str(tmp_path / 'amazon_reviews.db')) as conn:
+        return pd.read_sql_query('''
+            SELECT p.title, u.source_user_id, r.review_text, r.review_timestamp
+            FROM reviews r
+            JOIN products p ON p.product_id = r.product_id
+            JOIN users u ON u.user_id = r.user_id
+            ORDER BY r.review_text
+        ''', conn)
+
+
+def test_append_grown_wide_export(tmp_path, monkeypatch):
+    raw = tmp_path / 'purchase_history.csv'
+    wide_export(0, 40).to_csv(raw, index=False)
+    build(tmp_path, monkeypatch, raw_path=raw)
+
+    # The export grows by more users; append must pick them up without a rebuild
+    wide_export(40, 25).to_csv(raw, index=False, header=False, mode='a')
+    appended = build(tmp_path, monkeypatch, raw_path=raw, append=True)
+
+    reference_dir = tmp_path / 'reference'
+    reference_dir.mkdir()
+    reference = build(reference_dir, monkeypatch, raw_path=raw)
+
+    assert len(appended) == len(reference) > 0
+    pd.testing.assert_frame_equal(appended, reference)
+
+
+def test_swap_refused_while_readers_hold_the_wal(tmp_path, monkeypatch):
+    monkeypatch.setattr(create_db, 'SWAP_BUSY_TIMEOUT_MS', 50)
+    live, building = tmp_path / 'live.db', tmp_path / 'live.db.building'
+    writer = sqlite3.connect(str(live))
+    writer.execute('PRAGMA journal_mode=WAL')
+    writer.execute('CREATE TABLE t (x)')
+    writer.commit()
+    reader = sqlite3.connect(str(live))
+    reader.execute('BEGIN')
+    reader.execute('SELECT * FROM t').fetchall()
+    # Committed after the reader's snapshot, so the checkpoint cannot truncate the WAL
+    writer.execute('INSERT INTO t VALUES (1)')
+    writer.commit()
+    sqlite3.connect(str(building)).close()
+
+    with pytest.raises(RuntimeError):
+        create_db.swap_into_place(building, live)
+    assert building.exists()
+
+    reader.rollback()
+    create_db.swap_into_place(building, live)
+    assert not building.exists()
+    reader.close()
+    writer.close()
+
+
+def test_rerun_of_interrupted_append_refreshes_its_products(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'cleaned_purchase_history.csv'
+    cleaned_export(0, 300).to_csv(csv_path, index=False)
+    small_blocks(monkeypatch)
+    build(tmp_path, monkeypatch)
+
+    cleaned_export(300, 700).to_csv(csv_path, index=False, header=False, mode='a')
+    small_blocks(monkeypatch, fail_after=2)
+    with pytest.raises(Interrupted):
+        build(tmp_path, monkeypatch, append=True)
+    small_blocks(monkeypatch)
+    build(tmp_path, monkeypatch, append=True)
+
+    reference_dir = tmp_path / 'reference'
+    reference_dir.mkdir()
+    cleaned_export(0, 1000).to_csv(reference_dir / 'cleaned_purchase_history.csv', index=False)
+    build(reference_dir, monkeypatch)
+
+    for query in ('SELECT product_id, title, category, price, review_count, avg_rating FROM products',
+                  'SELECT * FROM product_metrics_mv ORDER BY product_id'):
+        pd.testing.assert_frame_equal(read_table(tmp_path, query), read_table(reference_dir, query))
+    assert read_table(tmp_path, 'SELECT SUM(review_count) AS n FROM products')['n'][0] == 1000
+    assert read_table(tmp_path, "SELECT * FROM ingest_state WHERE key = 'append_review_id'").empty
+
+
+def test_append_skips_reviews_already_loaded(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'cleaned_purchase_history.csv'
+    cleaned_export(0, 300).to_csv(csv_path, index=False)
+    build(tmp_path, monkeypatch)
+
+    # The export grows, repeating its last rows and one new row
+    repeated = pd.concat([cleaned_export(280, 120), cleaned_export(350, 1)])
+    repeated.to_csv(csv_path, index=False, header=False, mode='a')
+    build(tmp_path, monkeypatch, append=True)
+    # A re-export of everything so far, in another order, plus newer rows
+    cleaned_export(0, 450).iloc[::-1].to_csv(csv_path, index=False)
+    appended = build(tmp_path, monkeypatch, append=True)
+
+    reference_dir = tmp_path / 'reference'
+    reference_dir.mkdir()
+    cleaned_export(0, 450).to_csv(reference_dir / 'cleaned_purchase_history.csv', index=False)
+    reference = build(reference_dir, monkeypatch)
+
+    assert len(appended) == 450
+    pd.testing.assert_frame_equal(appended, reference)
+    query = 'SELECT title, review_count, avg_rating FROM products ORDER BY title'
+    pd.testing.assert_frame_equal(read_table(tmp_path, query), read_table(reference_dir, query))
+
+
+def test_resume_interrupted_build(tmp_path, monkeypatch):
+    cleaned_export(0, 600).to_csv(tmp_path / 'cleaned_purchase_history.csv', index=False)
+    small_blocks(monkeypatch, fail_after=3)
+    with pytest.raises(Interrupted):
+        build(tmp_path, monkeypatch)
+    assert (tmp_path / 'amazon_reviews.db.building').exists()
+    assert not (tmp_path / 'amazon_reviews.db').exists()
+
+    small_blocks(monkeypatch)
+    resumed = build(tmp_path, monkeypatch, resume=True)
+
+    reference_dir = tmp_path / 'reference'
+    reference_dir.mkdir()
+    cleaned_export(0, 600).to_csv(reference_dir / 'cleaned_purchase_history.csv', index=False)
+    reference = build(reference_dir, monkeypatch)
+
+    assert len(resumed) == 600
+    pd.testing.assert_frame_equal(resumed, reference)
+    for query in ('SELECT product_id, title, category, price, review_count, avg_rating FROM products',
+                  'SELECT * FROM product_metrics_mv ORDER BY product_id'):
+        pd.testing.assert_frame_equal(read_table(tmp_path, query), read_table(reference_dir, query))
+
+
+@pytest.mark.parametrize('suffix', ['.gz', '.zst'])
+def test_compressed_ingest_matches_plain_csv(tmp_path, monkeypatch, suffix):
+    if suffix == '.zst':
+        zstandard = pytest.importorskip('zstandard')
+    export = cleaned_export(0, 500)
+    # Quoted line breaks land on both sides of the small block boundaries
+    export['review_text'] = [f'review {n},\n"line" {n}' for n in range(len(export))]
+    data = export.to_csv(index=False).encode()
+    plain_dir, compressed_dir = tmp_path / 'plain', tmp_path / 'compressed'
+    plain_dir.mkdir()
+    compressed_dir.mkdir()
+    (plain_dir / 'cleaned_purchase_history.csv').write_bytes(data)
+    compressed_path = compressed_dir / f'cleaned_purchase_history.csv{suffix}'
+    compressed_path.write_bytes(gzip.compress(data) if suffix == '.gz'
+                                else zstandard.ZstdCompressor().compress(data))
+    small_blocks(monkeypatch)
+
+    plain = build(plain_dir, monkeypatch)
+    compressed = build(compressed_dir, monkeypatch, csv_path=compressed_path)
+
+    assert len(plain) == 500
+    assert plain['review_text'].str.contains('"line"').all()
+    pd.testing.assert_frame_equal(compressed, plain)
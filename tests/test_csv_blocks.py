@@ -0,0 +1,65 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+import csv_blocks
+
+# Quoted fields with line breaks, commas and doubled quotes
+CSV = (
+    b'title,review_text\n'
+    b'A,"one line"\n'
+    b'B,"two\nlines, ""quoted\n"" too"\n'
+    b'C,plain\n'
+    b'D,"ends with a break\n"\n'
+    b'E,"""\n"""\n'
+)
+
+
+def test_record_boundary_ignores_quoted_newlines():
+    assert csv_blocks._record_boundary(b'A,"x\ny"\nB,"z') == len(b'A,"x\ny"\n')
+    assert csv_blocks._record_boundary(b'A,""""\nB,1\n') == len(b'A,""""\nB,1\n')
+    assert csv_blocks._record_boundary(b'A,"""\n""') == -1
+    assert csv_blocks._record_boundary(b'A,"x\ny') == -1
+    assert csv_blocks._record_boundary(b'no newline') == -1
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 16, 1024])
+def test_record_blocks_hold_whole_records(block_size):
+    stream = io.BytesIO(CSV)
+    columns = csv_blocks.read_header(stream)
+    start = stream.tell()
+
+    blocks = list(csv_blocks.iter_record_blocks(stream, start, block_size))
+
+    assert b''.join(data for _, _, data in blocks) == CSV[start:]
+    assert [block_start for block_start, _, _ in blocks] == [start] + [end for _, end, _ in blocks[:-1]]
+    parsed = pd.concat([pd.read_csv(io.BytesIO(data), names=columns) for _, _, data in blocks], ignore_index=True)
+    pd.testing.assert_frame_equal(parsed, pd.read_csv(io.BytesIO(CSV)))
+
+
+def compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if csv_blocks.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    # Two frames, as concatenated or multi-threaded zstd output has
+    compressor = csv_blocks.zstandard.ZstdCompressor()
+    return compressor.compress(data[:40]) + compressor.compress(data[40:])
+
+
+@pytest.mark.parametrize("compression,suffix", [('gzip', '.gz'), ('zstd', '.zst'), ('gzip', '')])
+def test_open_source_decompresses(tmp_path, monkeypatch, compression, suffix):
+    monkeypatch.setattr(csv_blocks, 'PIECE_SIZE', 16)
+    path = tmp_path / f'purchases.csv{suffix}'
+    path.write_bytes(compress(CSV, compression))
+
+    assert csv_blocks.compression_of(path) == compression
+    with csv_blocks.open_source(path) as stream:
+        columns = csv_blocks.read_header(stream)
+        start = stream.tell()
+        stream.seek(start + len(b'A,"one line"\n'))
+        rest = stream.read()
+    assert columns == ['title', 'review_text']
+    assert rest == CSV[start + len(b'A,"one line"\n'):]
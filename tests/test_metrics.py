@@ -0,0 +1,44 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+import metrics
+
+AS_OF = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def small_db(tmp_path):
+    """Products across three categories (one missing) with reviews either side of the 30-day window"""
+    db_path = tmp_path / "amazon_reviews.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE products (product_id INTEGER PRIMARY KEY, title TEXT, category TEXT, price REAL)")
+    conn.execute("""CREATE TABLE reviews (review_id INTEGER PRIMARY KEY, product_id INTEGER,
+                    review_rating REAL, review_timestamp TIMESTAMP)""")
+    categories = ["Books", "Toys", None]
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?)", [
+        (product, f"Product {product}", categories[product % 3], None if product == 7 else 3.3 * product)
+        for product in range(1, 31)
+    ])
+    reviews = []
+    for review in range(400):
+        product = review % 27 + 1  # Products 28-30 have no reviews
+        timestamp = AS_OF - timedelta(days=review % 45, hours=review % 7)
+        reviews.append((product, float(review % 5 + 1), timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("INSERT INTO reviews (product_id, review_rating, review_timestamp) VALUES (?, ?, ?)", reviews)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.mark.skipif(metrics.duckdb is None, reason="duckdb is not installed")
+def test_duckdb_metrics_match_sqlite(small_db):
+    expected = metrics.compute_product_metrics(small_db, engine="sqlite", as_of=AS_OF)
+    actual = metrics.compute_product_metrics(small_db, engine="duckdb", as_of=AS_OF)
+
+    assert len(expected) == 30
+    assert expected["recent_reviews"].between(1, expected["review_count"].max() - 1).any()
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    assert metrics.check_parity(small_db, as_of=AS_OF)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import normalize
+
+SAMPLES = [
+    "  Great\u200bproduct!\r\n\r\nWould buy\tagain.  ",
+    "Line\u2028separated\u2029text\ufeff",
+    "Tabs\x0band\x0cfeeds\x1c\x1dand\xa0spaces\u3000here",
+    "\u200e\u200f",
+    "Caf\xe9 cr\xe8me \u2014 5/5, 10% off_sale!",
+    "",
+    None,
+]
+
+
+@pytest.fixture(params=["pyarrow", "pandas"])
+def engine(request, monkeypatch):
+    """Run each test with the pyarrow kernels and with the pandas fallback"""
+    if request.param == "pyarrow":
+        if normalize.pa is None:
+            pytest.skip("pyarrow is not installed")
+    else:
+        monkeypatch.setattr(normalize, "pa", None)
+    return request.param
+
+
+def test_normalize_text_matches_notebook_cleaning(engine):
+    series = pd.Series(SAMPLES, index=range(10, 10 + len(SAMPLES)))
+    expected = series.apply(normalize.clean_special_chars)
+
+    normalized = normalize.normalize_text(series)
+
+    assert normalized.index.equals(series.index)
+    assert normalized.iloc[:-1].tolist() == expected.iloc[:-1].tolist()
+    assert pd.isna(normalized.iloc[-1])
+
+
+def test_token_text_keeps_letters_digits_and_single_spaces(engine):
+    series = pd.Series(SAMPLES[:-1])
+    expected = [' '.join(''.join(c for c in normalize.clean_special_chars(text).lower()
+                                 if c.isalnum() or c.isspace()).split())
+                for text in SAMPLES[:-1]]
+
+    assert normalize.token_text(series).tolist() == expected
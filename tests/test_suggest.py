@@ -0,0 +1,63 @@
+import random
+
+import pandas as pd
+import pytest
+
+import suggest
+
+WORDS = ["running", "shoes", "run", "rug", "red", "blue", "bottle", "book", "box", "garden", "hose"]
+
+
+def expected_suggestions(entries, prefix, k):
+    """Brute-force ranking: every text with a word start matching prefix, by its best weight"""
+    prefix = suggest.search_key(prefix)
+    best = {}
+    for text, kind, weight in entries:
+        text = ' '.join(text.split())
+        if any(key.startswith(prefix) for key in suggest._word_starts(suggest.search_key(text))):
+            best[(text, kind)] = max(weight, best.get((text, kind), float('-inf')))
+    ranked = sorted(best, key=lambda completion: -best[completion])
+    return [{"text": text, "kind": kind} for text, kind in ranked[:k]]
+
+
+@pytest.fixture(scope="module")
+def entries():
+    rng = random.Random(0)
+    # Distinct weights, so the expected order has no ties
+    weights = rng.sample(range(100_000), 3000)
+    titles = [(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title() + rng.choice(["", "!", " - XL"]),
+               "title", weight / 100) for weight in weights[:2900]]
+    categories = [(f"{rng.choice(WORDS)} & {rng.choice(WORDS)}", "category", weight / 100) for weight in weights[2900:]]
+    return titles + categories
+
+
+@pytest.mark.parametrize("prefix", ["r", "ru", "run", "Running S", "sho", "b", "bo", "box!", "hose -", "zz", "  "])
+@pytest.mark.parametrize("k", [1, 10])
+def test_suggest_ranks_by_best_weight(entries, prefix, k):
+    index = suggest.PrefixIndex(entries)
+
+    suggestions = index.suggest(prefix, k)
+
+    if not suggest.search_key(prefix):
+        assert suggestions == []
+    else:
+        completions = [{"text": s["text"], "kind": s["kind"]} for s in suggestions]
+        assert completions == expected_suggestions(entries, prefix, k)
+    scores = [s["score"] for s in suggestions]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_suggestion_entries_weight_categories_by_their_best_product():
+    products = pd.DataFrame({
+        "title": ["Red Rug", "Blue Rug", "Garden Hose"],
+        "category": ["Rugs", "Rugs", "Garden"],
+        "product_score": [40.0, 75.5, None],
+    })
+    index = suggest.build_index(products)
+
+    assert index.suggest("ru", 5) == [
+        {"text": "Blue Rug", "kind": "title", "score": 75.5},
+        {"text": "Rugs", "kind": "category", "score": 75.5},
+        {"text": "Red Rug", "kind": "title", "score": 40.0},
+    ]
+    assert index.suggest("hose") == [{"text": "Garden Hose", "kind": "title", "score": 0.0}]
@@ -143,6 +143,16 @@ Shiny.addCustomMessageHandler('toggleLoading', function(show) {
     }
 });
 
+// Open the reviews modal for a product row (rows of both the paged and the virtualized table)
+function showReviews(productId) {
+    Shiny.setInputValue('selected_product', productId, {priority: 'event'});
+    document.getElementById('reviewsModal').style.display = 'block';
+}
+
+function closeModal() {
+    document.getElementById('reviewsModal').style.display = 'none';
+}
+
 // Handle keyboard navigation for table rows
 document.addEventListener('keydown', function(event) {
     if (event.target.closest('.product-row')) {
@@ -174,19 +184,37 @@ document.querySelectorAll('.product-row').forEach(row => {
     });
 });
 
-// Add input debouncing for search
-let searchTimeout;
-const searchInput = document.querySelector('input#product_search');
-if (searchInput) {
-    searchInput.addEventListener('input', function(e) {
-        clearTimeout(searchTimeout);
-        Shiny.setInputValue('loading', true);
-        
-        searchTimeout = setTimeout(() => {
-            Shiny.setInputValue('product_search', e.target.value);
-            setTimeout(() => {
-                Shiny.setInputValue('loading', false);
-            }, 300);
-        }, 300);
-    });
-}
+// Autocomplete the search box from /api/suggest
+const searchSuggestions = document.createElement('datalist');
+searchSuggestions.id = 'search-suggestions';
+document.body.appendChild(searchSuggestions);
+let suggestController = null;
+
+$(document).on('input', 'input#product_search', function(e) {
+    const input = e.target;
+    input.setAttribute('list', 'search-suggestions');
+    if (suggestController) {
+        suggestController.abort();
+    }
+    const prefix = input.value.trim();
+    if (!prefix) {
+        searchSuggestions.replaceChildren();
+        return;
+    }
+    suggestController = new AbortController();
+    fetch('api/suggest?' + new URLSearchParams({q: prefix, k: 8}), {signal: suggestController.signal})
+        .then(response => response.json())
+        .then(function(payload) {
+            searchSuggestions.replaceChildren(...payload.suggestions.map(function(suggestion) {
+                const option = document.createElement('option');
+                option.value = suggestion.text;
+                option.label = suggestion.kind;
+                return option;
+            }));
+        })
+        .catch(function(error) {
+            if (error.name !== 'AbortError') {
+                console.error('Error loading suggestions:', error);
+            }
+        });
+});
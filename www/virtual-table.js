@@ -0,0 +1,230 @@
+// Virtualized products table fed by the /api/products JSON endpoint.
+// Pages of rows are fetched as the user scrolls and cached per query; only the rows
+// inside the viewport (plus a small overscan) exist in the DOM at any time.
+
+const VIRTUAL_ROW_HEIGHT = 40;   // Must match .virtual-viewport td height
+const VIRTUAL_PAGE_SIZE = 200;   // Rows per API request
+const VIRTUAL_OVERSCAN = 10;     // Rows rendered above and below the viewport
+const VIRTUAL_REFETCH_DELAY = 300;  // ms of quiet input before the table is refetched
+const VIRTUAL_COLUMNS = [
+    'Product Title',
+    'Category',
+    'Price',
+    'Rating',
+    'Reviews',
+    'Price vs Category Avg %',
+    'Sentiment Score',
+    'Product Score'
+];
+
+const virtualTable = {
+    active: false,
+    pages: new Map(),      // page index -> {columns, values}
+    pending: new Map(),    // page index -> in-flight fetch
+    total: null,
+    generation: 0,         // Bumped on every query change so stale responses are dropped
+    controller: null,
+    frame: null,
+    refetchTimer: null
+};
+
+function virtualQuery() {
+    // The same inputs the server-rendered table is filtered and sorted by
+    const value = (id) => (document.getElementById(id) || {}).value || '';
+    const params = new URLSearchParams({
+        search: value('product_search'),
+        sort: value('sort_column') || 'Product Score',
+        direction: value('sort_direction') || 'desc'
+    });
+    // One categories= parameter per category, as category names may contain commas
+    const categories = document.getElementById('category_filter');
+    for (const option of categories ? categories.selectedOptions : []) {
+        params.append('categories', option.value);
+    }
+    return params;
+}
+
+function buildVirtualTable(container) {
+    container.innerHTML = '';
+    const viewport = document.createElement('div');
+    viewport.className = 'virtual-viewport';
+
+    const spacer = document.createElement('div');
+    spacer.className = 'virtual-spacer';
+
+    const table = document.createElement('table');
+    table.className = 'products-table';
+    const headerRow = document.createElement('tr');
+    VIRTUAL_COLUMNS.forEach(function(column) {
+        const th = document.createElement('th');
+        // th.sortable clicks are handled by script.js, which updates the sort inputs
+        th.className = 'sortable';
+        th.dataset.column = column;
+        th.setAttribute('role', 'button');
+        th.tabIndex = 0;
+        th.textContent = column;
+        headerRow.appendChild(th);
+    });
+    const thead = document.createElement('thead');
+    thead.appendChild(headerRow);
+    const tbody = document.createElement('tbody');
+    table.append(thead, tbody);
+
+    viewport.append(table, spacer);
+    const status = document.createElement('div');
+    status.className = 'virtual-status';
+    container.append(viewport, status);
+
+    viewport.addEventListener('scroll', scheduleVirtualRender, {passive: true});
+    tbody.addEventListener('click', function(e) {
+        const row = e.target.closest('tr[data-product-id]');
+        if (row) {
+            showReviews(row.dataset.productId);
+        }
+    });
+    Object.assign(virtualTable, {viewport, spacer, tbody, status});
+}
+
+function resetVirtualTable() {
+    if (virtualTable.controller) {
+        virtualTable.controller.abort();
+    }
+    virtualTable.controller = new AbortController();
+    virtualTable.generation += 1;
+    virtualTable.pages.clear();
+    virtualTable.pending.clear();
+    virtualTable.total = null;
+    virtualTable.viewport.scrollTop = 0;
+    virtualTable.spacer.style.height = '0px';
+    virtualTable.status.textContent = 'Loading…';
+    scheduleVirtualRender();
+}
+
+function fetchVirtualPage(page) {
+    if (virtualTable.pages.has(page) || virtualTable.pending.has(page)) {
+        return;
+    }
+    const generation = virtualTable.generation;
+    const params = virtualQuery();
+    params.set('cursor', String(page * VIRTUAL_PAGE_SIZE));
+    params.set('limit', String(VIRTUAL_PAGE_SIZE));
+
+    const request = fetch('api/products?' + params.toString(), {signal: virtualTable.controller.signal})
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        })
+        .then(function(payload) {
+            if (generation !== virtualTable.generation) {
+                return;  // The query changed while this page was in flight
+            }
+            virtualTable.pending.delete(page);
+            virtualTable.pages.set(page, payload);
+            if (payload.total !== undefined) {
+                virtualTable.total = payload.total;
+            } else if (virtualTable.total === null && payload.cursor === null) {
+                virtualTable.total = payload.offset + payload.values[0].length;
+            }
+            scheduleVirtualRender();
+        })
+        .catch(function(error) {
+            if (error.name !== 'AbortError') {
+                console.error('Error loading products page:', error);
+                virtualTable.pending.delete(page);
+                virtualTable.status.textContent = 'Error loading products';
+            }
+        });
+    virtualTable.pending.set(page, request);
+}
+
+function scheduleVirtualRender() {
+    if (virtualTable.frame === null) {
+        virtualTable.frame = requestAnimationFrame(function() {
+            virtualTable.frame = null;
+            renderVirtualRows();
+        });
+    }
+}
+
+function renderVirtualRows() {
+    if (!virtualTable.active) {
+        return;
+    }
+    const {viewport, spacer, tbody, status} = virtualTable;
+    const total = virtualTable.total;
+    if (total === null) {
+        fetchVirtualPage(0);
+        return;
+    }
+
+    // One extra row height for the sticky header
+    spacer.style.height = (total + 1) * VIRTUAL_ROW_HEIGHT + 'px';
+    const first = Math.max(0, Math.floor(viewport.scrollTop / VIRTUAL_ROW_HEIGHT) - VIRTUAL_OVERSCAN);
+    const visible = Math.ceil(viewport.clientHeight / VIRTUAL_ROW_HEIGHT) + 2 * VIRTUAL_OVERSCAN;
+    const last = Math.min(total, first + visible);
+
+    for (let page = Math.floor(first / VIRTUAL_PAGE_SIZE); page * VIRTUAL_PAGE_SIZE < last; page++) {
+        fetchVirtualPage(page);
+    }
+
+    const fragment = document.createDocumentFragment();
+    for (let index = first; index < last; index++) {
+        const payload = virtualTable.pages.get(Math.floor(index / VIRTUAL_PAGE_SIZE));
+        const tr = document.createElement('tr');
+        tr.className = 'product-row';
+        if (payload) {
+            const offset = index - payload.offset;
+            const columnValues = (column) => payload.values[payload.columns.indexOf(column)];
+            tr.dataset.productId = columnValues('product_id')[offset];
+            VIRTUAL_COLUMNS.forEach(function(column) {
+                const td = document.createElement('td');
+                const value = columnValues(column)[offset];
+                td.textContent = value === null || value === undefined ? '' : String(value);
+                tr.appendChild(td);
+            });
+        } else {
+            // Placeholder until the row's page arrives
+            const td = document.createElement('td');
+            td.colSpan = VIRTUAL_COLUMNS.length;
+            tr.appendChild(td);
+        }
+        fragment.appendChild(tr);
+    }
+    tbody.replaceChildren(fragment);
+    // The spacer gives the viewport its full scroll height; move the table to the first rendered row
+    tbody.parentElement.style.transform = 'translateY(' + first * VIRTUAL_ROW_HEIGHT + 'px)';
+    status.textContent = total === 0 ? 'No products found' :
+        `Rows ${first + 1}–${last} of ${total.toLocaleString()}`;
+}
+
+function toggleVirtualTable() {
+    const container = document.getElementById('virtual-products');
+    const paged = document.getElementById('products_table');
+    const toggle = document.getElementById('virtual-toggle');
+    if (!virtualTable.viewport) {
+        buildVirtualTable(container);
+    }
+    virtualTable.active = !virtualTable.active;
+    container.style.display = virtualTable.active ? 'block' : 'none';
+    paged.style.display = virtualTable.active ? 'none' : '';
+    toggle.textContent = virtualTable.active ? 'Show pages' : 'Scroll all results';
+    if (virtualTable.active) {
+        resetVirtualTable();
+    }
+}
+
+$(document).on('click', '#virtual-toggle', toggleVirtualTable);
+
+// Refetch when the inputs the table depends on change
+$(document).on('shiny:inputchanged', function(event) {
+    const watched = ['product_search', 'category_filter', 'filter_button', 'sort_column', 'sort_direction'];
+    if (virtualTable.active && watched.includes(event.name)) {
+        // Wait for typing to pause before refetching; the filter button applies at once.
+        // Either way the input value settles before it is read back.
+        clearTimeout(virtualTable.refetchTimer);
+        const delay = event.name === 'filter_button' ? 0 : VIRTUAL_REFETCH_DELAY;
+        virtualTable.refetchTimer = setTimeout(resetVirtualTable, delay);
+    }
+});